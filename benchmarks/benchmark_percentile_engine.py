@@ -0,0 +1,32 @@
+# coding=utf-8
+"""
+Compares the single-sort percentile engine against calling np.percentile once per percentile
+(the way Measurements.percentiles used to do it) over a range of sample sizes.
+"""
+from heuristics.misc.helpers import calculate_percentiles
+from timeit import repeat
+import numpy as np
+
+SAMPLE_SIZES = [1000, 10000, 100000, 1000000]
+PERCENTILES = list(range(1, 100))
+REPEATS = 3
+
+
+def percentile_per_call(data: list) -> list:
+    return [float(np.percentile(np.array(data), percentile)) for percentile in PERCENTILES]
+
+
+def percentile_engine(data: list) -> list:
+    return calculate_percentiles(data, PERCENTILES).tolist()
+
+
+if __name__ == "__main__":
+    generator = np.random.default_rng(1996)
+    print(f"{'samples':>10} {'per call (s)':>14} {'engine (s)':>12} {'speedup':>9}")
+    for sample_size in SAMPLE_SIZES:
+        sample = generator.lognormal(mean=-1, sigma=0.5, size=sample_size).tolist()
+        assert percentile_per_call(sample) == percentile_engine(sample)
+
+        per_call = min(repeat(lambda: percentile_per_call(sample), number=1, repeat=REPEATS))
+        engine = min(repeat(lambda: percentile_engine(sample), number=1, repeat=REPEATS))
+        print(f"{sample_size:>10} {per_call:>14.4f} {engine:>12.4f} {per_call / engine:>8.1f}x")
@@ -0,0 +1,311 @@
+# coding=utf-8
+"""
+Measures the throughput of the loader, the heuristics and the simulator on the bundled
+data sets and on synthetic data, writes the results as JSON and flags regressions
+against a stored baseline.
+Timings only compare on the same machine, so the baseline is generated per machine
+(--save-baseline) and is not part of the repository.
+
+    python -m benchmarks.suite --sizes 1000 10000 100000 --output results.json
+    python -m benchmarks.suite --save-baseline
+"""
+from heuristics.kolmogorov_smirnov_and_wasserstein import StatisticalDistance
+from heuristics.kullback_leibler_divergence_testing import DivergenceTest
+from heuristics.percentile_comparison import PercentileComparison
+from heuristics.students_t_test_used_for_outlier_check import TTest
+from heuristics.misc.measurements import Measurements
+from heuristics.misc.samples import SortedSample
+from data.wranglers import ConvertCsvResultsIntoArrays
+from testing.simulators import SimulateScenario, clear_scenario_factories
+from tests import LOCATION_HENDRICKS_SET_001, LOCATION_DAWSON_SET_001, HEURISTICS_BOUNDARIES
+from collections import namedtuple
+from time import perf_counter
+import numpy as np
+import pandas as pd
+import platform
+import contextlib
+import argparse
+import tempfile
+import json
+import io
+import sys
+import os
+
+BUNDLED_DATA_SETS = {
+    "hendricks": LOCATION_HENDRICKS_SET_001,
+    "dawson": LOCATION_DAWSON_SET_001,
+}
+BASELINE_LOCATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SAMPLE_SIZES = [1000, 10000, 100000, 1000000]
+FULL_SAMPLE_SIZES = SAMPLE_SIZES + [10000000]
+REPEATS = 3
+SEED = 1996
+
+# A timing is only called a regression when it is this much slower than the baseline.
+TOLERANCE = 0.25
+
+# Timings below this amount of seconds are too noisy to compare.
+MINIMUM_SECONDS = 0.001
+
+# A benchmark prepares its arguments from a data set (not timed) and runs on them (timed),
+# it is skipped on data sets with more than max_samples measurements.
+Benchmark = namedtuple("Benchmark", ["name", "prepare", "run", "max_samples"], defaults=[None])
+
+
+class DataSet:
+    """
+    A baseline and a benchmark run, together with a csv file that contains them.
+    """
+
+    def __init__(self, name: str, baseline: np.ndarray, benchmark: np.ndarray, location: str = None,
+                 baseline_id="RID-1", benchmark_id="RID-2", folder: str = None) -> None:
+        """
+        :param name: The name of the data set.
+        :param baseline: The baseline response times.
+        :param benchmark: The benchmark response times.
+        :param location: The csv file, when not given it is written to the folder on first use.
+        :param baseline_id: The RunID of the baseline in the csv file.
+        :param benchmark_id: The RunID of the benchmark in the csv file.
+        :param folder: The folder a synthetic csv file is written to.
+        """
+        self.name = name
+        self.baseline = baseline
+        self.benchmark = benchmark
+        self.baseline_id = baseline_id
+        self.benchmark_id = benchmark_id
+        self.folder = folder
+        if location is not None:
+            self.__dict__["_location_"] = location
+
+    @property
+    def samples(self) -> int:
+        """
+        The amount of measurements in the baseline.
+        :return: The sample size.
+        """
+        return int(len(self.baseline))
+
+    @property
+    def location(self) -> str:
+        """
+        The csv file with both runs, a synthetic csv file is only written when it is needed.
+        It contains half of the measurements of each run, so the file has as many lines as the sample size.
+        :return: The location of the csv file.
+        """
+        if "_location_" not in self.__dict__.keys():
+            half = max(self.samples // 2, 1)
+            frame = pd.DataFrame({
+                "ResponseTime": np.concatenate((self.baseline[:half], self.benchmark[:half])),
+                "RunID": [self.baseline_id] * half + [self.benchmark_id] * half,
+                "Time": np.tile(np.arange(half), 2),
+                "TransactionName": "demo",
+            })
+            location = os.path.join(self.folder, f"{self.name}.csv")
+            frame.to_csv(location, sep=";", decimal=",", index=False)
+            self.__dict__["_location_"] = location
+        return self.__dict__["_location_"]
+
+
+def load_bundled_data_set(name: str) -> DataSet:
+    """
+    Will load the first two runs of a bundled data set.
+    :param name: The name of the data set.
+    :return: The data set.
+    """
+    runs = ConvertCsvResultsIntoArrays(BUNDLED_DATA_SETS[name])
+    baseline_id, benchmark_id = list(runs.keys())[:2]
+    return DataSet(name, runs[baseline_id]["response_times"], runs[benchmark_id]["response_times"],
+                   location=BUNDLED_DATA_SETS[name], baseline_id=baseline_id, benchmark_id=benchmark_id)
+
+
+def create_synthetic_data_set(samples: int, folder: str, seed: int = SEED) -> DataSet:
+    """
+    Will generate a log-normal baseline and a slightly slower benchmark rounded to milliseconds,
+    like the response times of a real performance test.
+    :param samples: The amount of measurements per run.
+    :param folder: The folder the csv file is written to when it is needed.
+    :param seed: The seed of the generator.
+    :return: The data set.
+    """
+    generator = np.random.default_rng(seed)
+    baseline = np.round(generator.lognormal(mean=-1, sigma=0.5, size=samples), 3)
+    benchmark = np.round(generator.lognormal(mean=-0.95, sigma=0.5, size=samples), 3)
+    return DataSet(f"synthetic-{samples}", baseline, benchmark, folder=folder)
+
+
+def _prepare_samples(data_set: DataSet) -> tuple:
+    return SortedSample(data_set.baseline), SortedSample(data_set.benchmark)
+
+
+def _run_measurements(data: list) -> tuple:
+    measurements = Measurements(data)
+    return measurements.average, measurements.standard_deviation, measurements.percentiles, measurements.ecdf
+
+
+def _run_simulation(data_set: DataSet) -> None:
+    # Every repeat reads the csv data set again instead of reusing the scenario factory of the previous repeat.
+    clear_scenario_factories()
+    simulation = SimulateScenario(data_set.location, HEURISTICS_BOUNDARIES, benchmark_id=data_set.benchmark_id,
+                                  baseline_id=data_set.baseline_id)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation.run_consistently_changing_benchmark_fictitious_scenario(
+            percent_of_data=10, save_image=False, positive=True, show_image=False, processes=1
+        )
+
+
+BENCHMARKS = [
+    Benchmark("loader", lambda data_set: (data_set.location,),
+              lambda location: ConvertCsvResultsIntoArrays(location)),
+    Benchmark("measurements", lambda data_set: (data_set.baseline.tolist(),), _run_measurements),
+    Benchmark("sorted_sample", lambda data_set: (data_set.baseline,),
+              lambda data: SortedSample(data).ecdf),
+    Benchmark("statistical_distance", _prepare_samples,
+              lambda baseline, benchmark: StatisticalDistance(baseline, benchmark, HEURISTICS_BOUNDARIES).score),
+    Benchmark("divergence_test", _prepare_samples,
+              lambda baseline, benchmark: DivergenceTest(baseline, benchmark).score),
+    Benchmark("percentile_comparison", _prepare_samples,
+              lambda baseline, benchmark: PercentileComparison(benchmark, baseline).score),
+    Benchmark("t_test", lambda data_set: (data_set.baseline, data_set.benchmark),
+              lambda baseline, benchmark: TTest(baseline, benchmark).results),
+    # A sweep compares a hundred scenarios, so it is only run on the smaller data sets.
+    Benchmark("simulator", lambda data_set: (data_set,), _run_simulation, max_samples=100000),
+]
+
+
+def measure(benchmark: Benchmark, data_set: DataSet, repeats: int = REPEATS) -> dict:
+    """
+    Will time a benchmark on a data set.
+    :param benchmark: The benchmark.
+    :param data_set: The data set.
+    :param repeats: How many times the benchmark is timed, the fastest time is reported.
+    :return: The result of the benchmark.
+    """
+    arguments = benchmark.prepare(data_set)
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        benchmark.run(*arguments)
+        timings.append(perf_counter() - start)
+
+    seconds = min(timings)
+    return {
+        "benchmark": benchmark.name,
+        "data_set": data_set.name,
+        "samples": data_set.samples,
+        "seconds": seconds,
+        "mean_seconds": float(np.mean(timings)),
+        "samples_per_second": data_set.samples / seconds if seconds else None,
+    }
+
+
+def run_suite(sizes: list = None, repeats: int = REPEATS, names: list = None, bundled: bool = True) -> dict:
+    """
+    Will run the benchmarks on the bundled data sets and on synthetic data of every size.
+    :param sizes: The sample sizes of the synthetic data sets.
+    :param repeats: How many times every benchmark is timed.
+    :param names: The names of the benchmarks to run, by default all of them.
+    :param bundled: When True the bundled data sets are measured as well.
+    :return: The environment and the results.
+    """
+    benchmarks = [benchmark for benchmark in BENCHMARKS if names is None or benchmark.name in names]
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        data_sets = [load_bundled_data_set(name) for name in BUNDLED_DATA_SETS] if bundled else []
+        for samples in SAMPLE_SIZES if sizes is None else sizes:
+            data_sets.append(create_synthetic_data_set(samples, folder))
+
+        for data_set in data_sets:
+            for benchmark in benchmarks:
+                if benchmark.max_samples is None or data_set.samples <= benchmark.max_samples:
+                    results.append(measure(benchmark, data_set, repeats))
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float = TOLERANCE,
+                     minimum_seconds: float = MINIMUM_SECONDS) -> list:
+    """
+    Will compare the results with a baseline, a benchmark on a data set regressed when
+    it is more than the tolerance slower than in the baseline.
+    :param results: The results of run_suite.
+    :param baseline: Earlier results of run_suite.
+    :param tolerance: The allowed slowdown, 0.25 allows 25%.
+    :param minimum_seconds: Timings where both runs are faster than this are not compared.
+    :return: The regressions with the time of the baseline and the slowdown ratio.
+    """
+    expected = {
+        (result["benchmark"], result["data_set"], result["samples"]): result["seconds"]
+        for result in baseline["results"]
+    }
+    regressions = []
+    for result in results["results"]:
+        baseline_seconds = expected.get((result["benchmark"], result["data_set"], result["samples"]))
+        if baseline_seconds is None or max(baseline_seconds, result["seconds"]) < minimum_seconds:
+            continue
+
+        ratio = result["seconds"] / max(baseline_seconds, minimum_seconds)
+        if ratio > 1 + tolerance:
+            regressions.append(dict(result, baseline_seconds=baseline_seconds, ratio=ratio))
+    return regressions
+
+
+def main(arguments: list = None) -> int:
+    """
+    Will run the suite from the command line.
+    :return: The exit code, 1 when a regression is found.
+    """
+    parser = argparse.ArgumentParser(description="Measures the loader, the heuristics and the simulator.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help="the synthetic sample sizes (default 1k to 1M)")
+    parser.add_argument("--full", action="store_true", help="also measure 10M samples")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--benchmarks", nargs="+", default=None, choices=[benchmark.name for benchmark in BENCHMARKS])
+    parser.add_argument("--output", default=None, help="the JSON file the results are written to")
+    parser.add_argument("--baseline", default=BASELINE_LOCATION, help="the JSON file with the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    options = parser.parse_args(arguments)
+
+    sizes = FULL_SAMPLE_SIZES if options.full and options.sizes is None else options.sizes
+    results = run_suite(sizes, options.repeats, options.benchmarks)
+
+    print(f"{'benchmark':<22} {'data set':<18} {'samples':>10} {'seconds':>10} {'samples/s':>12}")
+    for result in results["results"]:
+        print(f"{result['benchmark']:<22} {result['data_set']:<18} {result['samples']:>10} "
+              f"{result['seconds']:>10.4f} {result['samples_per_second'] or 0:>12.0f}")
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if options.save_baseline:
+        with open(options.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        return 0
+
+    if not os.path.isfile(options.baseline):
+        return 0
+
+    with open(options.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("environment") != results["environment"]:
+        print(f"WARNING the baseline was measured in another environment, regenerate it with --save-baseline: "
+              f"{baseline.get('environment')}")
+    regressions = find_regressions(results, baseline, options.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression['benchmark']} on {regression['data_set']} ({regression['samples']} samples): "
+              f"{regression['seconds']:.4f}s vs {regression['baseline_seconds']:.4f}s ({regression['ratio']:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,31 +3,84 @@ from os import listdir
 import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
+from heuristics.misc.kernels import merge_sorted_samples
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from PIL import Image
+import plotly.io as pio
 import pandas as pd
-import imageio
+import numpy as np
+import threading
+import imageio.v2
 import os
 
 
 class LineGraph:
+    MAX_POINTS = 5000
 
-    def __init__(self, benchmark, baseline, wasserstein_distance, kolmogorov_smirnov_distance, rank, score, change):
+    def __init__(self, benchmark, baseline, wasserstein_distance, kolmogorov_smirnov_distance, rank, score, change,
+                 max_points=MAX_POINTS):
         """
         Will build the image.
+        The given ECDF's are not changed, by default an ECDF with more than 5000 points is
+        reduced to at most max_points points, which makes the plot of a large run differ
+        slightly from plotting every measurement. ECDF's that already fit are drawn as they are.
         :param benchmark:
         :param baseline:
+        :param max_points: The maximum amount of points drawn per ECDF, None draws every point.
         """
-        benchmark["type"] = ["benchmark" for _ in range(0, len(benchmark["measure"]))]
-        baseline["type"] = ["baseline" for _ in range(0, len(baseline["measure"]))]
         self.wasserstein_distance = wasserstein_distance
         self.kolmogorov_smirnov_distance = kolmogorov_smirnov_distance
         self.rank = rank
         self.score = score
         self.change = change
-        self.dataframe = pd.concat([baseline, benchmark])
+
+        if max_points is not None and max(len(baseline), len(benchmark)) > max_points:
+            gap = self._kolmogorov_smirnov_gap(baseline, benchmark)
+            baseline = self._downsample_ecdf(baseline, max_points, gap)
+            benchmark = self._downsample_ecdf(benchmark, max_points, gap)
+
+        self.dataframe = pd.concat([baseline.assign(type="baseline"), benchmark.assign(type="benchmark")])
         self.message_versus_simulation = f"Wasserstein d-value <b>{self.wasserstein_distance}</b>, " \
                                          f"KS d-value: <b>{self.kolmogorov_smirnov_distance}</b>"
         self.message_estimated_rank_simulation = f" Estimated rank: <b>{self.rank}</b>"
 
+    @staticmethod
+    def _kolmogorov_smirnov_gap(baseline, benchmark) -> float:
+        """
+        Will find the measure at which the two ECDF's are the furthest apart.
+        :param baseline: The ECDF of the baseline.
+        :param benchmark: The ECDF of the benchmark.
+        :return: The measure of the kolmogorov smirnov distance.
+        """
+        values, counts_a, counts_b = merge_sorted_samples(baseline["measure"].values, benchmark["measure"].values)
+        last_of_tie = np.append(values[1:] != values[:-1], True)
+        gaps = np.abs(counts_a[last_of_tie] / len(baseline) - counts_b[last_of_tie] / len(benchmark))
+        return float(values[last_of_tie][np.argmax(gaps)])
+
+    @staticmethod
+    def _downsample_ecdf(ecdf, max_points: int, gap: float):
+        """
+        Will reduce an ECDF to at most max_points points (plus the points around the gap).
+        Half of the points are spread evenly over the probability and half evenly over the
+        measure, so both the flat parts and the steep tail keep their shape.
+        The first and last point and the two points around the kolmogorov smirnov gap are always kept.
+        :param ecdf: The ECDF, sorted by measure.
+        :param max_points: The maximum amount of points.
+        :param gap: The measure of the kolmogorov smirnov distance.
+        :return: The reduced ECDF as a new data frame.
+        """
+        size = len(ecdf)
+        if size <= max_points:
+            return ecdf
+
+        measures = ecdf["measure"].values
+        by_probability = np.linspace(0, size - 1, max(max_points // 2, 2)).astype(np.int64)
+        by_measure = np.searchsorted(measures, np.linspace(measures[0], measures[-1], max(max_points // 2, 2)))
+        around_gap = np.searchsorted(measures, gap, side="right") - 1 + np.arange(2)
+        positions = np.unique(np.clip(np.concatenate((by_probability, by_measure, around_gap)), 0, size - 1))
+        return ecdf.iloc[positions]
+
     def _render_figure(self):
         """
         Will render the data into a figure.
@@ -62,38 +115,87 @@ class LineGraph:
         figure = self._render_figure()
         figure.show()
 
-    def save_frame(self, folder: str, filename: str, image_format=".png") -> None:
+    def save_frame(self, folder: str, filename: str, image_format=".png", engine="orca") -> None:
         """
         Saving image using the orca engine the default
         kaleido engine was not working for me.
         :param image_format : The format of the image
         :param folder: target folder on disk
         :param filename: the file name;
+        :param engine: The plotly image export engine.
         """
         figure = self._render_figure()
-        if not os.path.exists(folder):
-            os.mkdir(folder)
+        os.makedirs(folder, exist_ok=True)
 
         figure.write_image(
             file=f"{str(folder)}\\{str(filename)}{str(image_format)}",
             format=image_format.strip("."),
-            engine="orca"
+            engine=engine
         )
 
 
 class ScatterPlot:
+    WEBGL_THRESHOLD = 20000
+    DENSITY_THRESHOLD = 500000
+    DENSITY_BINS = (400, 200)
 
-    def __init__(self, scenario, rank, score, change):
+    def __init__(self, scenario, rank, score, change, mode="auto"):
         """
         will build a scatter plot image
         :param scenario:
         :param rank:
         :param change:
+        :param mode: "svg" draws every measurement, "webgl" draws every measurement with WebGL and
+        "density" draws a logarithmic density grid. "auto" picks one based on the amount of measurements.
         """
+        if mode not in ("auto", "svg", "webgl", "density"):
+            raise ValueError(f"Unknown scatter plot mode: {mode}")
         self.scenario = scenario
         self.rank = rank
         self.score = score
         self.change = change
+        self.mode = mode
+
+    @property
+    def render_mode(self) -> str:
+        """
+        The mode used to draw the measurements, in auto mode WebGL is used above the
+        WEBGL_THRESHOLD and a density grid above the DENSITY_THRESHOLD.
+        :return: "svg", "webgl" or "density".
+        """
+        if self.mode != "auto":
+            return self.mode
+        size = max(len(self.scenario.benchmark_y), len(self.scenario.baseline_y))
+        if size > self.DENSITY_THRESHOLD:
+            return "density"
+        return "webgl" if size > self.WEBGL_THRESHOLD else "svg"
+
+    def _create_trace(self, x, y, name: str):
+        """
+        Will create the trace of one run in the render mode.
+        :param x: The time stamps.
+        :param y: The response times.
+        :param name: The name of the trace.
+        :return: The plotly trace.
+        """
+        mode = self.render_mode
+        if mode == "svg":
+            return go.Scatter(x=x, y=y, mode='markers', name=name)
+        elif mode == "webgl":
+            return go.Scattergl(x=x, y=y, mode='markers', name=name)
+
+        # The density grid is binned over the logarithm of the response times, like the y-axis.
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        positive = y > 0
+        counts, x_edges, y_edges = np.histogram2d(x[positive], np.log10(y[positive]), bins=self.DENSITY_BINS)
+        return go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=10 ** ((y_edges[:-1] + y_edges[1:]) / 2),
+            z=np.where(counts > 0, np.log10(counts + 1), np.nan).T,
+            coloraxis="coloraxis",
+            name=name
+        )
 
     def _render_figure(self):
         """
@@ -102,17 +204,13 @@ class ScatterPlot:
         """
         figure = make_subplots(rows=1, cols=2)
         figure.add_trace(
-            go.Scatter(x=self.scenario.benchmark_x, y=self.scenario.benchmark_y,
-                       mode='markers', name="benchmark"
-                       ),
+            self._create_trace(self.scenario.benchmark_x, self.scenario.benchmark_y, "benchmark"),
             row=1,
             col=1
         )
 
         figure.add_trace(
-            go.Scatter(x=self.scenario.baseline_x, y=self.scenario.baseline_y,
-                       mode='markers', name="baseline"
-                       ),
+            self._create_trace(self.scenario.baseline_x, self.scenario.baseline_y, "baseline"),
             row=1,
             col=2,
         )
@@ -120,6 +218,9 @@ class ScatterPlot:
             height=800, width=1200,
             title_text=f"Benchmark Vs Baseline, scored: <b>{self.score}</b>",
         )
+        if self.render_mode == "density":
+            # Both runs share one color scale so their densities can be compared.
+            figure.update_layout(coloraxis=dict(colorscale="Viridis", colorbar=dict(title="log10(count)")))
         figure.update_yaxes(type="log", range=[-2.5, 2.5], title_text="Response Time in Seconds (logarithmic scale)")
         figure.update_xaxes(title_text="Epoch Time Stamps")
         return figure
@@ -131,40 +232,160 @@ class ScatterPlot:
         figure = self._render_figure()
         figure.show()
 
-    def save_frame(self, folder: str, filename: str, image_format=".png") -> None:
+    def save_frame(self, folder: str, filename: str, image_format=".png", engine="orca") -> None:
         """
         Saving image using the orca engine the default
         kaleido engine was not working for me.
         :param image_format : The format of the image
         :param folder: target folder on disk
         :param filename: the file name;
+        :param engine: The plotly image export engine.
         """
         figure = self._render_figure()
-        if not os.path.exists(folder):
-            os.mkdir(folder)
+        os.makedirs(folder, exist_ok=True)
 
         figure.write_image(
             file=f"{str(folder)}\\{str(filename)}{str(image_format)}",
             format=image_format.strip("."),
-            engine="orca"
+            engine=engine
         )
 
 
+class ImageExporter:
+    """
+    Will save the frames of graphs in a small pool of threads, so a simulation does not
+    have to wait for every image to be rendered.
+    The renderer (the orca server) is started once and kept alive for all exports, and
+    the amount of frames waiting to be rendered is bounded to keep the memory flat.
+    """
+    _renderer_lock = threading.Lock()
+    _started_renderers = set()
+
+    def __init__(self, max_workers=2, max_pending=None, engine="orca"):
+        """
+        Will create the pool, the renderer is started on the first export.
+        :param max_workers: The amount of threads that render images.
+        :param max_pending: The maximum amount of queued and running exports, by default
+        twice the amount of workers. Exporting blocks until a slot is free.
+        :param engine: The plotly image export engine.
+        """
+        self.engine = engine
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-exporter")
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * max_workers)
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _ensure_renderer(self) -> None:
+        """
+        Will start the persistent renderer of the engine once per process.
+        """
+        with self._renderer_lock:
+            if self.engine not in self._started_renderers:
+                if self.engine == "orca":
+                    pio.orca.ensure_server()
+                self._started_renderers.add(self.engine)
+
+    def save_frame(self, graph, folder: str, filename: str, image_format=".png"):
+        """
+        Will queue the export of a LineGraph or ScatterPlot.
+        :param graph: The graph that needs to be saved.
+        :param folder: target folder on disk
+        :param filename: the file name;
+        :param image_format : The format of the image
+        :return: The future of the export.
+        """
+        self._ensure_renderer()
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(graph.save_frame, folder, filename, image_format, self.engine)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        # Finished exports are forgotten, failed ones are kept so wait can raise their error.
+        self._futures = [
+            pending for pending in self._futures if not pending.done() or pending.exception() is not None
+        ] + [future]
+        return future
+
+    def wait(self) -> None:
+        """
+        Will wait until every queued export is saved, raising the first export error.
+        """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        """
+        Will wait for the queued exports and stop the threads.
+        """
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+
 class Animation:
 
     def __init__(self):
         pass
 
     @staticmethod
-    def render_frames_in_target_directory_to_gif(target_folder: str, export_folder: str):
+    def _read_frame(location: str, scale=None, colors=None) -> np.ndarray:
+        """
+        Will decode one frame and optionally shrink it.
+        :param location: The location of the image.
+        :param scale: An optional factor (between 0 and 1) to downscale the frame with.
+        :param colors: An optional amount of colors to quantize the frame to.
+        :return: The frame as an array.
+        """
+        frame = imageio.v2.imread(location)
+        if scale is None and colors is None:
+            return frame
+
+        image = Image.fromarray(frame).convert("RGB")
+        if scale is not None:
+            size = (max(int(image.width * scale), 1), max(int(image.height * scale), 1))
+            image = image.resize(size, Image.LANCZOS)
+        if colors is not None:
+            image = image.quantize(colors=colors).convert("RGB")
+        return np.asarray(image)
+
+    @staticmethod
+    def render_frames_in_target_directory_to_gif(target_folder: str, export_folder: str, workers=4, scale=None,
+                                                 colors=None, **kwargs) -> str:
         """
         Will create gif.
-        :return:
+        The frames are appended to the gif one by one in the order of their (numeric) file names,
+        while the next frames are decoded in a few threads, so the memory does not grow with
+        the amount of frames.
+        :param target_folder: The folder with the frames, named after their position (0.png, 1.png, ...)
+        :param export_folder: The folder the out.gif is written to.
+        :param workers: The amount of threads that decode frames.
+        :param scale: An optional factor (between 0 and 1) to downscale every frame with.
+        :param colors: An optional amount of colors to quantize every frame to.
+        :param kwargs: Extra options for the gif writer, for example the duration of a frame.
+        :return: The location of the gif.
         """
-        images = []
         files_in_target_folder = [f for f in listdir(target_folder) if isfile(join(target_folder, f))]
-        files_in_target_folder = sorted(files_in_target_folder,key=lambda x: int(os.path.splitext(x)[0]))
-        for file_name in files_in_target_folder:
-            print(file_name)
-            images.append(imageio.imread(f"{target_folder}\\{file_name}"))
-        imageio.mimsave(f"{export_folder}\\out.gif", images)
+        files_in_target_folder = sorted(files_in_target_folder, key=lambda x: int(os.path.splitext(x)[0]))
+        location = join(export_folder, "out.gif")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor, \
+                imageio.v2.get_writer(location, mode="I", **kwargs) as writer:
+            # Only a window of frames is decoded ahead of the writer.
+            pending = deque()
+            for file_name in files_in_target_folder:
+                pending.append(executor.submit(Animation._read_frame, join(target_folder, file_name), scale, colors))
+                if len(pending) > 2 * workers:
+                    writer.append_data(pending.popleft().result())
+            while pending:
+                writer.append_data(pending.popleft().result())
+
+        return location
@@ -1,6 +1,12 @@
+from heuristics.misc.samples import SortedSample
+from heuristics.misc.instrumentation import stage
 import pandas as pd
+import numpy as np
+import hashlib
 import random
 import json
+import uuid
+import os
 
 
 class ConvertCsvResultsIntoDictionary:
@@ -12,6 +18,8 @@ class ConvertCsvResultsIntoDictionary:
         """
         self.file = pd.read_csv(path, chunksize=10000, delimiter=";")
         self.data = {}
+        # The StageTiming of the conversion, only filled while instrumentation is enabled.
+        self.timings = {}
         self.convert_csv_to_json()
 
     @property
@@ -26,8 +34,12 @@ class ConvertCsvResultsIntoDictionary:
         """
         Will read the csv file in chunks and convert it to json.
         """
-        for chunk in self.file:
-            self.add_chunk_to_json(chunk)
+        with stage(self.timings, "parsing") as parsing:
+            rows = 0
+            for chunk in self.file:
+                self.add_chunk_to_json(chunk)
+                rows += len(chunk)
+            parsing.samples = rows
 
     def add_chunk_to_json(self, chunk) -> None:
         """
@@ -58,9 +70,433 @@ class ConvertCsvResultsIntoDictionary:
                 self.data[runid]["actions"].append(action)
 
 
+def _hash_file(path: str) -> str:
+    """
+    Will hash the content of a file.
+    :param path: The path to the file
+    :return: The hexadecimal blake2b digest.
+    """
+    content_hash = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            content_hash.update(block)
+    return content_hash.hexdigest()
+
+
+def fingerprint_file(path: str, content_hash: bool = True) -> dict:
+    """
+    Will create a fingerprint of a file that changes when the file changes.
+    :param path: The path to the file
+    :param content_hash: When False the content is not hashed and only the size and modification time are used.
+    :return: A dictionary with the path, size, modification time and (optional) content hash.
+    """
+    status = os.stat(path)
+    fingerprint = {
+        "path": os.path.abspath(path),
+        "size": status.st_size,
+        "mtime": status.st_mtime_ns
+    }
+    if content_hash:
+        fingerprint["hash"] = _hash_file(path)
+    return fingerprint
+
+
+def fingerprint_matches(path: str, fingerprint: dict) -> bool:
+    """
+    Will check if a file still matches a stored fingerprint.
+    The size and modification time are compared first, the content is only hashed
+    when the file was touched without changing its size.
+    :param path: The path to the file
+    :param fingerprint: The stored fingerprint.
+    :return: True when the file has not changed.
+    """
+    if not isinstance(fingerprint, dict):
+        return False
+
+    current = fingerprint_file(path, content_hash=False)
+    if current["path"] != fingerprint.get("path") or current["size"] != fingerprint.get("size"):
+        return False
+    if current["mtime"] == fingerprint.get("mtime"):
+        return True
+    return "hash" in fingerprint and _hash_file(path) == fingerprint["hash"]
+
+
+def read_response_times_in_chunks(path: str, run_id=None, chunksize: int = 100000):
+    """
+    Will read the response times of a csv file chunk by chunk, so runs that
+    are larger than memory can be summarized in a streaming fashion.
+    :param path: The path to the file
+    :param run_id: When given only the response times of this RunID are yielded.
+    :param chunksize: The amount of lines that are parsed per chunk.
+    :return: A generator of NumPy arrays with response times.
+    """
+    reader = pd.read_csv(
+        path,
+        delimiter=";",
+        decimal=",",
+        header=0,
+        names=ConvertCsvResultsIntoArrays.COLUMNS,
+        usecols=[0, 1],
+        chunksize=chunksize
+    )
+    for chunk in reader:
+        if run_id is not None:
+            chunk = chunk[chunk["run_id"] == run_id]
+        yield chunk["response_time"].to_numpy(dtype=np.float64)
+
+
+class ColumnarResults:
+
+    def __init__(self) -> None:
+        """
+        Holds the results of a performance test as one contiguous column per
+        metric together with a RunID -> (offset, length) index.
+        """
+        self.response_times = np.empty(0, dtype=np.float64)
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.action_codes = np.empty(0, dtype=np.int32)
+        self.action_names = np.empty(0, dtype=str)
+        self.index = {}
+        # The StageTiming of the loading stages, only filled while instrumentation is enabled.
+        self.timings = {}
+
+    def __getitem__(self, run_id) -> dict:
+        """
+        Will give back the measurements of a single run as array views,
+        no data is copied when a run is requested.
+        :param run_id: The RunID of the requested run.
+        :return: A dictionary with the same keys as the json data set.
+        """
+        action_codes = self.column(run_id, "action_codes")
+        return {
+            "response_times": self.column(run_id, "response_times"),
+            "timestamps": self.column(run_id, "timestamps"),
+            "actions": self.action_names[action_codes],
+            "action_codes": action_codes
+        }
+
+    def __contains__(self, run_id) -> bool:
+        return run_id in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def column(self, run_id, name: str) -> np.ndarray:
+        """
+        Will slice a single column of a run without copying or decoding it.
+        :param run_id: The RunID of the requested run.
+        :param name: The column, either response_times, timestamps or action_codes.
+        :return: A view on the requested part of the column.
+        """
+        offset, length = self.index[run_id]
+        return getattr(self, name)[offset:offset + length]
+
+    def keys(self) -> list:
+        """
+        The RunID's in the order they first appeared in the csv file.
+        :return: A list of RunID's
+        """
+        return list(self.index)
+
+    @property
+    def data(self) -> dict:
+        """
+        A compatibility view that has the same structure as
+        ConvertCsvResultsIntoDictionary.data, only build when it is requested.
+        :return: The data set as a Python dictionary with lists.
+        """
+        if "_data_" not in self.__dict__.keys():
+            self.__dict__["_data_"] = {
+                run_id: {
+                    "response_times": run["response_times"].tolist(),
+                    "timestamps": run["timestamps"].tolist(),
+                    "actions": run["actions"].tolist()
+                }
+                for run_id, run in ((run_id, self[run_id]) for run_id in self.index)
+            }
+        return self.__dict__["_data_"]
+
+    @property
+    def json(self):
+        """
+        will convert the python dictionary to true json
+        :return:
+        """
+        return json.dumps(self.data)
+
+    def build_index(self, run_ids: list, lengths: np.ndarray) -> None:
+        """
+        Will map every RunID to the offset and length of its slice in the columns.
+        :param run_ids: The RunID's in the order they are stored.
+        :param lengths: The amount of measurements per RunID.
+        """
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+        self.index = {
+            run_id: (int(offset), int(length)) for run_id, offset, length in zip(run_ids, offsets, lengths)
+        }
+
+
+class ConvertCsvResultsIntoArrays(ColumnarResults):
+
+    COLUMNS = ["response_time", "run_id", "timestamp", "action"]
+    CACHE_EXTENSION = ".npz"
+
+    def __init__(self, path: str, cache: bool = False, cache_folder: str = None) -> None:
+        """
+        When constructed will parse the csv file in one vectorized pass.
+        Instead of appending every line to Python lists it will group the
+        measurements by RunID and keep them as contiguous NumPy arrays.
+        :param path: The path to the file
+        :param cache: When True the parsed arrays are stored in a binary sidecar file
+        which is reloaded as long as the source file has not changed.
+        :param cache_folder: The folder of the sidecar file, by default it is stored next to the csv file.
+        """
+        super(ConvertCsvResultsIntoArrays, self).__init__()
+        self.path = path
+        self.cache = cache
+        self.cache_folder = cache_folder
+        if not (self.cache and self.load_cache()):
+            self.convert_csv_to_arrays()
+            if self.cache:
+                self.save_cache()
+
+    def convert_csv_to_arrays(self) -> None:
+        """
+        Will read the csv file with the decimal comma parsed by pandas and
+        group all lines by RunID with one stable sort.
+        Keep in mind that within a run the original order is kept.
+        That way it is possible to still connect the Y axis to the X axis
+        and see which action was executed.
+        A ValueError is raised when a line has no RunID or transaction name.
+        """
+        with stage(self.timings, "parsing") as parsing:
+            frame = pd.read_csv(self.path, delimiter=";", decimal=",", header=0, names=self.COLUMNS)
+            parsing.samples = len(frame)
+
+        # A line without a RunID or transaction name can not be grouped, factorize would code it as -1.
+        missing = frame["run_id"].isna() | frame["action"].isna()
+        if missing.any():
+            lines = (np.flatnonzero(missing.to_numpy()) + 2).tolist()
+            raise ValueError(
+                f"{self.path} has {len(lines)} line(s) without a RunID or transaction name, "
+                f"for example line {', '.join(map(str, lines[:5]))}."
+            )
+
+        with stage(self.timings, "grouping", samples=len(frame)):
+            run_codes, run_ids = pd.factorize(frame["run_id"], sort=False)
+            action_codes, action_names = pd.factorize(frame["action"], sort=False)
+            order = np.argsort(run_codes, kind="stable")
+
+            self.response_times = np.ascontiguousarray(frame["response_time"].to_numpy(dtype=np.float64)[order])
+            self.timestamps = np.ascontiguousarray(frame["timestamp"].to_numpy()[order])
+            self.action_codes = np.ascontiguousarray(action_codes.astype(np.int32)[order])
+            self.action_names = np.asarray(action_names, dtype=str)
+            self.build_index(run_ids=run_ids.tolist(), lengths=np.bincount(run_codes, minlength=len(run_ids)))
+
+    @property
+    def cache_location(self) -> str:
+        """
+        The location of the binary sidecar file of the csv file.
+        :return: The path to the sidecar file.
+        """
+        folder, filename = os.path.split(os.path.abspath(self.path))
+        return os.path.join(self.cache_folder or folder, filename + self.CACHE_EXTENSION)
+
+    def load_cache(self) -> bool:
+        """
+        Will reload the parsed arrays from the sidecar file when its fingerprint
+        still matches the source file, which normally only costs an os.stat.
+        When a touched file still has the same content the sidecar file is written again
+        with the new modification time, so the next reload does not hash the file again.
+        :return: True when the cache was loaded, False when the csv needs to be parsed.
+        """
+        if not os.path.isfile(self.cache_location):
+            return False
+
+        try:
+            with np.load(self.cache_location, allow_pickle=False) as cache:
+                fingerprint = json.loads(str(cache["fingerprint"]))
+                if not fingerprint_matches(self.path, fingerprint):
+                    # The source has changed since the cache was written.
+                    return False
+
+                self.response_times = cache["response_times"]
+                self.timestamps = cache["timestamps"]
+                self.action_codes = cache["action_codes"]
+                self.action_names = cache["action_names"]
+                self.build_index(run_ids=cache["run_ids"].tolist(), lengths=cache["lengths"])
+
+        except (OSError, ValueError, KeyError):
+            # A corrupt or outdated sidecar file is simply rebuild.
+            return False
+
+        modification_time = os.stat(self.path).st_mtime_ns
+        if fingerprint["mtime"] != modification_time:
+            self.save_cache(fingerprint=dict(fingerprint, mtime=modification_time))
+        return True
+
+    def save_cache(self, fingerprint: dict = None) -> None:
+        """
+        Will write the parsed arrays and the fingerprint of the source file to the sidecar file.
+        The file is first written to a temporary location, so a partially written
+        cache is never picked up.
+        :param fingerprint: The fingerprint of the source file, by default it is created.
+        """
+        fingerprint = fingerprint or fingerprint_file(self.path)
+        temporary_location = f"{self.cache_location}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_location, "wb") as file:
+                np.savez(
+                    file,
+                    fingerprint=np.array(json.dumps(fingerprint)),
+                    response_times=self.response_times,
+                    timestamps=self.timestamps,
+                    action_codes=self.action_codes,
+                    action_names=self.action_names,
+                    run_ids=np.asarray(list(self.index)),
+                    lengths=np.array([length for _, length in self.index.values()], dtype=np.int64)
+                )
+            os.replace(temporary_location, self.cache_location)
+
+        except OSError:
+            # The cache is an optimization, a read-only location should not break the conversion.
+            if os.path.exists(temporary_location):
+                os.remove(temporary_location)
+
+
+class ColumnarRunStore(ColumnarResults):
+
+    INDEX_FILE = "index.json"
+    COLUMN_FILES = {
+        "response_times": "response_times.npy",
+        "timestamps": "timestamps.npy",
+        "action_codes": "action_codes.npy"
+    }
+
+    def __init__(self, folder: str) -> None:
+        """
+        Will open an on-disk columnar store with numpy.memmap.
+        Only the index is read into memory, the columns are paged in by the
+        operating system when a run is sliced.
+        :param folder: The folder that contains the store.
+        """
+        super(ColumnarRunStore, self).__init__()
+        self.folder = folder
+        with open(os.path.join(folder, self.INDEX_FILE), "r") as file:
+            self.metadata = json.load(file)
+
+        # Stores written before the column files had a generation use the plain file names.
+        for name, filename in self.metadata.get("columns", self.COLUMN_FILES).items():
+            setattr(self, name, np.load(os.path.join(folder, filename), mmap_mode="r"))
+        self.action_names = np.asarray(self.metadata["action_names"], dtype=str)
+        self.index = {run_id: (offset, length) for run_id, offset, length in self.metadata["runs"]}
+
+    @classmethod
+    def create(cls, folder: str, results: ColumnarResults, fingerprint: dict = None):
+        """
+        Will write the columns and the RunID index of parsed results to a store.
+        :param folder: The folder in which the store is created.
+        :param results: The parsed results, for example ConvertCsvResultsIntoArrays.
+        :param fingerprint: The fingerprint of the source file the store was build from.
+        :return: The opened store.
+        """
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        # Every rebuild writes its columns under new file names, so the files of a store that is
+        # still memory-mapped are never touched. Replacing the index is the only step that switches
+        # readers over to the new columns, after which the old columns are removed when possible.
+        index_location = os.path.join(folder, cls.INDEX_FILE)
+        try:
+            with open(index_location, "r") as file:
+                stale_columns = set(json.load(file).get("columns", cls.COLUMN_FILES).values())
+        except (OSError, ValueError, AttributeError):
+            stale_columns = set()
+
+        generation = uuid.uuid4().hex
+        columns = {}
+        for name, filename in cls.COLUMN_FILES.items():
+            columns[name] = filename.replace(".npy", f".{generation}.npy")
+            with open(os.path.join(folder, columns[name]), "wb") as file:
+                np.save(file, np.ascontiguousarray(getattr(results, name)))
+
+        cls._write_index(folder, {
+            "fingerprint": fingerprint,
+            "columns": columns,
+            "action_names": results.action_names.tolist(),
+            "runs": [[run_id, offset, length] for run_id, (offset, length) in results.index.items()]
+        })
+
+        for filename in stale_columns - set(columns.values()):
+            try:
+                os.remove(os.path.join(folder, filename))
+            except OSError:
+                # A column that is still memory-mapped (on Windows) is left behind for a later rebuild.
+                pass
+        return cls(folder)
+
+    @classmethod
+    def _write_index(cls, folder: str, metadata: dict) -> None:
+        """
+        Will atomically replace the index of a store.
+        :param folder: The folder of the store.
+        :param metadata: The fingerprint, the column files, the action names and the runs of the store.
+        """
+        index_location = os.path.join(folder, cls.INDEX_FILE)
+        with open(f"{index_location}.{os.getpid()}.tmp", "w") as file:
+            json.dump(metadata, file)
+        os.replace(f"{index_location}.{os.getpid()}.tmp", index_location)
+
+    @classmethod
+    def from_csv(cls, path: str, folder: str = None):
+        """
+        Will open the store of a csv file, the store is (re)build when it
+        does not exist yet or when the csv file has changed.
+        Only the index file is read to check the fingerprint, the columns of a stale
+        store are never memory-mapped.
+        :param path: The path to the csv file.
+        :param folder: The folder of the store, by default a folder next to the csv file.
+        :return: The opened store.
+        """
+        folder = folder or f"{os.path.abspath(path)}.store"
+        try:
+            with open(os.path.join(folder, cls.INDEX_FILE), "r") as file:
+                metadata = json.load(file)
+            fingerprint = metadata["fingerprint"]
+            if fingerprint_matches(path, fingerprint):
+                # A touched csv file with the same content gets its new modification time stored.
+                modification_time = os.stat(path).st_mtime_ns
+                if fingerprint["mtime"] != modification_time:
+                    cls._write_index(folder, dict(metadata, fingerprint=dict(fingerprint, mtime=modification_time)))
+                return cls(folder)
+
+        except (OSError, ValueError, KeyError):
+            pass
+
+        results = ConvertCsvResultsIntoArrays(path)
+        return cls.create(folder, results, fingerprint=fingerprint_file(path))
+
+
+def open_results(location: str, cache: bool = False) -> ColumnarResults:
+    """
+    Will open a data set either from a columnar store folder or from a csv file.
+    :param location: The location of the store folder or the csv file.
+    :param cache: If the csv file should be parsed through the sidecar cache, which writes a file
+    next to the csv file, by default it is parsed without one.
+    :return: The data set which can be indexed by RunID.
+    """
+    if os.path.isdir(location):
+        return ColumnarRunStore(location)
+    return ConvertCsvResultsIntoArrays(location, cache=cache)
+
+
 class CreateFictitiousScenario:
 
-    def __init__(self, baseline_id, benchmark_id, data_set_location, positive, percentage=0, delta=0):
+    def __init__(self, baseline_id, benchmark_id, data_set_location, positive, percentage=0, delta=0,
+                 generator=None, replace=True):
         """
 
         :param percentage:
@@ -69,44 +505,192 @@ class CreateFictitiousScenario:
         :param benchmark_id:
         :param positive: True when the change the delta needs to increase on false delta will be used
         to decrease response time
+        :param generator: An optional numpy.random.Generator used to pick the changed measurements,
+        when not given a generator is seeded from the global random module.
+        :param replace: When True a measurement can be picked (and changed) more than once.
         """
-        scenarios = ConvertCsvResultsIntoDictionary(data_set_location).data
+        scenarios = open_results(data_set_location)
 
         time_stamps = scenarios[baseline_id]["timestamps"]
         response_times = scenarios[baseline_id]["response_times"]
-        self.baseline_x = list(time_stamps)
-        self.baseline_y = list(response_times)
+        self.baseline_x = np.array(time_stamps)
+        self.baseline_y = np.array(response_times, dtype=np.float64)
 
         time_stamps = scenarios[benchmark_id]["timestamps"]
         response_times = scenarios[benchmark_id]["response_times"]
-        self.benchmark_x = list(time_stamps)
+        self.benchmark_x = np.array(time_stamps)
         self.benchmark_y = self.randomly_decrease_or_increase_part_of_the_population(
             population=response_times,
             percentage=percentage,
             delta=delta,
-            positive=positive
+            positive=positive,
+            generator=generator,
+            replace=replace
         )
 
-    @staticmethod
-    def randomly_decrease_or_increase_part_of_the_population(population, positive, percentage=0, delta=0):
+    @classmethod
+    def from_factory(cls, factory, benchmark_y: np.ndarray):
+        """
+        Will create a scenario out of the prepared data of a scenario factory without reading
+        or copying the data set again.
+        :param factory: The ScenarioFactory that holds the baseline and benchmark.
+        :param benchmark_y: The changed benchmark response times.
+        :return: The scenario, its baseline sample is shared with the factory.
+        """
+        scenario = cls.__new__(cls)
+        scenario.baseline_x = factory.baseline_x
+        scenario.baseline_y = factory.baseline_y
+        scenario.benchmark_x = factory.benchmark_x
+        scenario.benchmark_y = benchmark_y
+        scenario.__dict__["_baseline_sample_"] = factory.baseline_sample
+        return scenario
+
+    @property
+    def baseline_sample(self) -> SortedSample:
+        """
+        The sorted baseline, as the baseline never changes it only needs to be sorted once.
+        :return: The baseline as a SortedSample.
         """
+        if "_baseline_sample_" not in self.__dict__.keys():
+            self.__dict__["_baseline_sample_"] = SortedSample(self.baseline_y)
+        return self.__dict__["_baseline_sample_"]
 
+    @staticmethod
+    def randomly_decrease_or_increase_part_of_the_population(population, positive, percentage=0, delta=0,
+                                                             generator=None, replace=True) -> np.ndarray:
+        """
+        Will change a random part of the population by the delta with array operations.
+        The given population is never modified, a new array is returned.
+        When a measurement is picked k times (sampling with replacement) the change
+        is compounded k times, the same as changing it k times one after another.
         :param delta:
         :param population:
         :param percentage:
         :param positive: True when the change the delta needs to increase on false delta will be used
         to decrease response time
-        :return:
+        :param generator: An optional numpy.random.Generator used to pick the changed measurements,
+        when not given a generator is seeded from the global random module (so random.seed still applies).
+        :param replace: When True a measurement can be picked (and changed) more than once.
+        :return: The changed population as a new array.
         """
-        for _ in range(0, int(len(population) / 100 * percentage)):
-            rand_index = abs(random.randint(0, len(population) - 1))
-            change = float(population[rand_index] / 100 * delta)
-            current = population[rand_index]
-            if positive:
-                new = current + change
-            else:
-                new = abs(current - change)
+        population = np.array(population, dtype=np.float64)
+        return CreateFictitiousScenario._change_part_of_the_population(
+            population, positive, percentage, delta, generator, replace
+        )
 
-            population[rand_index] = new
+    @staticmethod
+    def _change_part_of_the_population(population: np.ndarray, positive, percentage, delta, generator,
+                                       replace) -> np.ndarray:
+        """
+        Will change a random part of a float64 population in place.
+        :return: The same (changed) population.
+        """
+        amount_of_changes = int(len(population) / 100 * percentage)
+        if amount_of_changes == 0:
+            return population
+
+        generator = np.random.default_rng(random.getrandbits(64)) if generator is None else generator
+        if replace:
+            picked = np.bincount(generator.integers(0, len(population), size=amount_of_changes),
+                                 minlength=len(population))
+            indexes = np.flatnonzero(picked)
+            picked = picked[indexes]
+        else:
+            indexes = generator.choice(len(population), size=amount_of_changes, replace=False)
+            picked = 1
+
+        if positive:
+            population[indexes] *= (1 + delta / 100) ** picked
+        else:
+            population[indexes] = np.abs(population[indexes]) * abs(1 - delta / 100) ** picked
 
         return population
+
+
+class ScenarioFactory:
+    """
+    Will read the baseline and benchmark of a data set once and create any amount of
+    fictitious scenarios out of them.
+    The baseline is sorted only once and shared by every scenario, a scenario only costs
+    a copy of the benchmark (into a reusable buffer) and the change itself.
+    """
+
+    def __init__(self, baseline_id, benchmark_id, data_set_location, perc: float = 95) -> None:
+        """
+        Will load the baseline and benchmark.
+        :param baseline_id: The RunID of the baseline.
+        :param benchmark_id: The RunID of the benchmark.
+        :param data_set_location: Either a csv file or the folder of a columnar run store.
+        :param perc: The percentile cut-off point used to normalize the baseline.
+        """
+        scenarios = open_results(data_set_location)
+        self.baseline_id = baseline_id
+        self.benchmark_id = benchmark_id
+        self.perc = perc
+
+        self.baseline_x = np.array(scenarios[baseline_id]["timestamps"])
+        self.baseline_y = np.array(scenarios[baseline_id]["response_times"], dtype=np.float64)
+        self.benchmark_x = np.array(scenarios[benchmark_id]["timestamps"])
+        self.benchmark_y = np.array(scenarios[benchmark_id]["response_times"], dtype=np.float64)
+        for array in (self.baseline_x, self.baseline_y, self.benchmark_x, self.benchmark_y):
+            array.flags.writeable = False
+
+    @property
+    def baseline_sample(self) -> SortedSample:
+        """
+        The sorted baseline, it is computed once and shared by every scenario.
+        :return: The baseline as a SortedSample.
+        """
+        if "_baseline_sample_" not in self.__dict__.keys():
+            self.__dict__["_baseline_sample_"] = SortedSample(self.baseline_y, perc=self.perc)
+        return self.__dict__["_baseline_sample_"]
+
+    @property
+    def buffer(self) -> np.ndarray:
+        """
+        A buffer the size of the benchmark which can be reused for every changed benchmark.
+        :return: A float64 NumPy array.
+        """
+        if "_buffer_" not in self.__dict__.keys():
+            self.__dict__["_buffer_"] = np.empty_like(self.benchmark_y)
+        return self.__dict__["_buffer_"]
+
+    def change_benchmark(self, positive, percentage=0, delta=0, generator=None, replace=True,
+                         out: np.ndarray = None) -> np.ndarray:
+        """
+        Will change a random part of the benchmark, see
+        CreateFictitiousScenario.randomly_decrease_or_increase_part_of_the_population.
+        :param positive: True when the change the delta needs to increase on false delta will be used
+        to decrease response time
+        :param percentage: The amount in percentage of the benchmark that needs to be changed.
+        :param delta: The amount of change.
+        :param generator: An optional numpy.random.Generator used to pick the changed measurements.
+        :param replace: When True a measurement can be picked (and changed) more than once.
+        :param out: An optional float64 array with the size of the benchmark that receives the result,
+        for example the buffer. It is overwritten by the next change that uses it.
+        :return: The changed benchmark.
+        """
+        if out is None:
+            out = np.array(self.benchmark_y)
+        else:
+            np.copyto(out, self.benchmark_y)
+        return CreateFictitiousScenario._change_part_of_the_population(
+            out, positive, percentage, delta, generator, replace
+        )
+
+    def create(self, positive, percentage=0, delta=0, generator=None, replace=True,
+               out: np.ndarray = None) -> CreateFictitiousScenario:
+        """
+        Will create a fictitious scenario with a randomly changed benchmark.
+        :param positive: True when the change the delta needs to increase on false delta will be used
+        to decrease response time
+        :param percentage: The amount in percentage of the benchmark that needs to be changed.
+        :param delta: The amount of change.
+        :param generator: An optional numpy.random.Generator used to pick the changed measurements.
+        :param replace: When True a measurement can be picked (and changed) more than once.
+        :param out: An optional buffer for the changed benchmark, see change_benchmark.
+        :return: The scenario.
+        """
+        return CreateFictitiousScenario.from_factory(
+            self, self.change_benchmark(positive, percentage, delta, generator, replace, out)
+        )
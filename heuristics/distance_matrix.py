@@ -0,0 +1,123 @@
+# coding=utf-8
+from heuristics.misc.kernels import calculate_distance_statistics
+from heuristics.misc.scoring import compile_scoring_matrix, compile_letter_ranks, score_distances, \
+    letter_rank_distances
+from heuristics.misc.samples import SortedSample
+from concurrent.futures import ProcessPoolExecutor
+from pandas import DataFrame
+import numpy as np
+import os
+
+# The normalized runs of the worker process, shared once per worker instead of once per task.
+_WORKER_SAMPLES = []
+
+
+def _initialize_worker(samples: list) -> None:
+    """
+    Will store the normalized runs in the worker process.
+    :param samples: The normalized (sorted) runs.
+    """
+    global _WORKER_SAMPLES
+    _WORKER_SAMPLES = samples
+
+
+def _calculate_row(row: int) -> tuple:
+    """
+    Will compute the distances of one run to every run that comes after it.
+    :param row: The position of the run.
+    :return: The row and its kolmogorov smirnov and Wasserstein distances.
+    """
+    distances = [
+        calculate_distance_statistics(_WORKER_SAMPLES[row], _WORKER_SAMPLES[column])
+        for column in range(row + 1, len(_WORKER_SAMPLES))
+    ]
+    return row, distances
+
+
+class RunDistanceMatrix:
+    """
+    Will compare every run of a data set against every other run with the
+    kolmogorov smirnov and Wasserstein distance.
+    Each run is normalized and sorted only once, after which all pairs are
+    computed in parallel and scored and letter ranked with the same heuristic
+    as the StatisticalDistance class.
+    This can be used to pick a stable baseline out of a long history of runs.
+    """
+
+    def __init__(self, runs, heuristics_boundaries: dict, run_ids: list = None, perc: float = 95,
+                 processes: int = None) -> None:
+        """
+        Will prepare every run and compute the distance matrices.
+        :param runs: The runs by RunID, for example ConvertCsvResultsIntoArrays or its .data dictionary.
+        A run can also be given as a list or array of response times.
+        :param heuristics_boundaries: a set of boundaries that determine the outcome of the heuristic -
+        interpretation of the distance comparison.
+        :param run_ids: The RunID's that need to be compared, by default all runs.
+        :param perc: The percentile cut-off point used to normalize the runs.
+        :param processes: The amount of worker processes, by default one per core.
+        1 computes everything in the current process.
+        """
+        self.run_ids = list(runs.keys()) if run_ids is None else list(run_ids)
+        self.processes = processes or os.cpu_count() or 1
+        self._samples = [self._normalize(runs[run_id], perc) for run_id in self.run_ids]
+
+        ks_matrix, ws_matrix = self._calculate_distance_matrices()
+        self.kolmogorov_smirnov_distance = DataFrame(ks_matrix, index=self.run_ids, columns=self.run_ids)
+        self.wasserstein_distance = DataFrame(ws_matrix, index=self.run_ids, columns=self.run_ids)
+
+        scores = np.round(score_distances(ws_matrix, ks_matrix, compile_scoring_matrix(heuristics_boundaries)), 2)
+        self.score = DataFrame(np.where(scores == 0, 1, scores), index=self.run_ids, columns=self.run_ids)
+        self.letter_rank = DataFrame(
+            letter_rank_distances(ws_matrix, ks_matrix, compile_letter_ranks(heuristics_boundaries)),
+            index=self.run_ids,
+            columns=self.run_ids
+        )
+
+    @staticmethod
+    def _normalize(run, perc: float) -> np.ndarray:
+        """
+        Will normalize and sort a run once.
+        :param run: A run dictionary with response times or the response times themselves.
+        :param perc: The percentile cut-off point used to normalize the run.
+        :return: The sorted normalized response times.
+        """
+        response_times = run["response_times"] if isinstance(run, dict) else run
+        return np.ascontiguousarray(SortedSample(response_times, perc=perc).normalized)
+
+    def _calculate_distance_matrices(self) -> tuple:
+        """
+        Will fill the symmetric distance matrices, the upper triangle is computed
+        row by row spread over the worker processes.
+        :return: The kolmogorov smirnov and the Wasserstein distance matrix (rounded like StatisticalDistance).
+        """
+        size = len(self._samples)
+        ks_matrix = np.zeros((size, size))
+        ws_matrix = np.zeros((size, size))
+
+        if self.processes == 1 or size < 3:
+            _initialize_worker(self._samples)
+            rows = [_calculate_row(row) for row in range(size)]
+            _initialize_worker([])
+        else:
+            with ProcessPoolExecutor(self.processes, initializer=_initialize_worker,
+                                     initargs=(self._samples,)) as executor:
+                rows = list(executor.map(_calculate_row, range(size)))
+
+        for row, distances in rows:
+            for offset, (ks_distance, ws_distance) in enumerate(distances):
+                column = row + 1 + offset
+                ks_matrix[row, column] = ks_matrix[column, row] = round(ks_distance, 3)
+                ws_matrix[row, column] = ws_matrix[column, row] = round(ws_distance, 3)
+
+        return ks_matrix, ws_matrix
+
+    @property
+    def stable_baseline(self):
+        """
+        The run that is the closest to all other runs, it has the highest average
+        score against every other run which makes it a good baseline candidate.
+        :return: The RunID of the most stable run.
+        """
+        scores = self.score.to_numpy(dtype=np.float64, copy=True)
+        np.fill_diagonal(scores, np.nan)
+        return self.run_ids[int(np.nanargmax(np.nanmean(scores, axis=1)))]
@@ -1,5 +1,12 @@
 # coding=utf-8
-from scipy.stats import wasserstein_distance, ks_2samp
+from heuristics.misc.kernels import calculate_distance_statistics, kolmogorov_smirnov_asymptotic_probability
+from heuristics.misc.scoring import compile_scoring_matrix, compile_letter_ranks, score_distances, \
+    letter_rank_distances
+from heuristics.misc.samples import SortedSample
+from heuristics.misc.instrumentation import stage
+from heuristics.misc.resampling import bootstrap_distance_statistics, confidence_interval, \
+    permutation_kolmogorov_smirnov_probability
+from scipy.stats import ks_2samp
 from pandas import DataFrame
 import numpy as np
 
@@ -27,16 +34,37 @@ class StatisticalDistance:
     which can be adjusted to fit your own need.
     """
     SEED = 1996
+    # Above this sample size the exact p-value is too slow and the asymptotic one is used (like scipy).
+    MAX_EXACT_PROBABILITY_SIZE = 10000
+    # The default significance level the permutation p-value stops at once it is clearly above or below it.
+    PERMUTATION_ALPHA = 0.05
+    # The default permutation budget.
+    MAX_PERMUTATIONS = 10000
 
-    def __init__(self, baseline_ecdf: DataFrame, benchmark_ecdf: DataFrame, heuristics_boundaries: dict) -> None:
+    def __init__(self, baseline_ecdf: DataFrame, benchmark_ecdf: DataFrame, heuristics_boundaries: dict,
+                 probability_method: str = "auto", bootstrap_resamples: int = 0, confidence_level: float = 0.95,
+                 processes: int = None, permutation_alpha: float = PERMUTATION_ALPHA,
+                 max_permutations: int = MAX_PERMUTATIONS) -> None:
         """
         Will construct the class and calculate all the required statistics.
         After all the computation have been completed the following information can then
         be extracted from this class:
-        :param baseline_ecdf: An list of floats of the A population (baseline).
-        :param benchmark_ecdf: An list of floats of the B population (benchmark).
+        :param baseline_ecdf: The ECDF of the A population (baseline) or its SortedSample.
+        :param benchmark_ecdf: The ECDF of the B population (benchmark) or its SortedSample.
         :param heuristics_boundaries: a set of boundaries that determine the outcome of the heuristic -
         interpretation of the distance comparison.
+        :param probability_method: How the kolmogorov smirnov p-value is computed, "exact", "asymp",
+        "permutation" (a seeded permutation test that stays valid with many ties)
+        or "auto" which picks exact for samples up to 10000 measurements (the scipy default).
+        :param bootstrap_resamples: When given the amount of bootstrap resamples used to estimate
+        confidence intervals of both distances and the score, by default no intervals are computed.
+        :param confidence_level: The confidence level of the bootstrap intervals.
+        :param processes: The amount of worker processes used for bootstrapping, by default one per core.
+        :param permutation_alpha: The significance level the permutation p-value is compared with,
+        the permutations stop once the p-value is clearly above or below it.
+        :param max_permutations: The maximum amount of permutations of the permutation p-value.
+        When instrumentation is enabled the StageTiming of every stage (normalization, ecdf, distances,
+        kolmogorov_smirnov_probability, scoring and bootstrap) is stored in the timings mapping.
         """
         # Building scoring matrix
         self._wasserstein_lowest_boundary = heuristics_boundaries["score_boundaries"]["wasserstein_lowest_boundary"]
@@ -44,16 +72,33 @@ class StatisticalDistance:
                                                                                              "_lowest_boundary"]
         self._matrix_size = heuristics_boundaries["score_boundaries"]["matrix_size"]
         self.boundary_increment = heuristics_boundaries["score_boundaries"]["boundary_increment"]
-        self.SCORING_MATRIX = self._generate_scoring_matrix()
         self.LETTER_RANKS = heuristics_boundaries["letter_ranks"]
+        self._scoring_matrix = compile_scoring_matrix(heuristics_boundaries, seed=self.SEED)
+        self._letter_ranks = compile_letter_ranks(heuristics_boundaries)
 
         # Calculate statistics
-        self.sample_a = baseline_ecdf
-        self.sample_b = benchmark_ecdf
+        self.timings = {}
+        self.sample_a, self.sample_b = self._resolve_ecdfs(baseline_ecdf, benchmark_ecdf)
+        self.probability_method = probability_method
+        self.permutation_alpha = permutation_alpha
+        self.max_permutations = max_permutations
+        self.permutations = None
+        samples = len(self.sample_a) + len(self.sample_b)
+        with stage(self.timings, "distances", samples=samples):
+            self._distance_statistics = calculate_distance_statistics(
+                self.sample_a["measure"].values,
+                self.sample_b["measure"].values
+            )
         self._ws_d_value = self._calculate_wasserstein_distance_statistics()
-        self._ks_d_value, self._ks_p_value = self._calculate_kolmogorov_smirnov_distance_statistics()
-        self.letter_rank = self._letter_rank_distance_statistics()
-        self.score = self._score_distance_statistics()
+        with stage(self.timings, "kolmogorov_smirnov_probability", samples=samples):
+            self._ks_d_value, self._ks_p_value = self._calculate_kolmogorov_smirnov_distance_statistics()
+        with stage(self.timings, "scoring", samples=samples):
+            self.letter_rank = self._letter_rank_distance_statistics()
+            self.score = self._score_distance_statistics()
+        with stage(self.timings if bootstrap_resamples else None, "bootstrap", samples=samples):
+            self.confidence_intervals = self._bootstrap_confidence_intervals(
+                bootstrap_resamples, confidence_level, processes
+            ) if bootstrap_resamples else None
 
     @property
     def wasserstein_distance(self) -> float:
@@ -92,45 +137,66 @@ class StatisticalDistance:
         """
         return self._ks_p_value
 
+    @property
+    def SCORING_MATRIX(self) -> list:
+        """
+        The scoring matrix as a list of boundaries and punishments.
+        :return: The generated scoring matrix
+        """
+        return self._generate_scoring_matrix()
+
     def _generate_scoring_matrix(self) -> list:
         """
-        Will generate a scoring matrix that can be used to make a score go up or down.
-        It does this by using the dirichlet distribution.
+        Will give back the scoring matrix that can be used to make a score go up or down.
+        The boundaries and the dirichlet punishments (seed 1996) are compiled only once per
+        configuration of the score boundaries by compile_scoring_matrix, this list is build
+        from that compiled matrix on every call.
         :return: A generated scoring matrix
         """
-        # Building predictive dirichlet scoring matrix using seed 1996
-        np.random.seed(self.SEED)
-        dirichlet_distribution = list(np.random.dirichlet(alpha=np.ones(self._matrix_size), size=1)[0])
-        dirichlet_distribution.sort(reverse=True)
-
-        # Generating scoring grid
-        wst_start_val = self._wasserstein_lowest_boundary
-        ks_start_val = self._kolmogorov_smirnov_lowest_boundary
-        scoring_matrix = []
-        for punishment in dirichlet_distribution:
-            scoring_matrix.append(
-                {
-                    "wasserstein_boundary": wst_start_val,
-                    "kolmogorov_smirnov_boundary": ks_start_val,
-                    "punishment": punishment
-                }
+        return [
+            {
+                "wasserstein_boundary": float(wasserstein_boundary),
+                "kolmogorov_smirnov_boundary": float(kolmogorov_smirnov_boundary),
+                "punishment": float(punishment)
+            }
+            for wasserstein_boundary, kolmogorov_smirnov_boundary, punishment in zip(
+                self._scoring_matrix.wasserstein_boundaries,
+                self._scoring_matrix.kolmogorov_smirnov_boundaries,
+                self._scoring_matrix.punishments
             )
-            wst_start_val += self.boundary_increment
-            ks_start_val += self.boundary_increment
+        ]
+
+    def _resolve_ecdfs(self, baseline_ecdf, benchmark_ecdf) -> tuple:
+        """
+        Will give back the ECDF's of the baseline and the benchmark, sorted samples are
+        normalized and turned into their (cached) ECDF.
+        :param baseline_ecdf: The ECDF of the A population (baseline) or its SortedSample.
+        :param benchmark_ecdf: The ECDF of the B population (benchmark) or its SortedSample.
+        :return: The ECDF of the baseline and of the benchmark.
+        """
+        sorted_samples = [sample for sample in (baseline_ecdf, benchmark_ecdf) if isinstance(sample, SortedSample)]
+        if not sorted_samples:
+            return baseline_ecdf, benchmark_ecdf
 
-        return scoring_matrix
+        samples = sum(sample.count for sample in sorted_samples)
+        with stage(self.timings, "normalization", samples=samples):
+            for sample in sorted_samples:
+                # Reading the cut-off computes and caches it, so its cost lands in this stage and not in "ecdf".
+                _ = sample.normalization_cutoff
+        with stage(self.timings, "ecdf", samples=samples):
+            return tuple(
+                sample.ecdf if isinstance(sample, SortedSample) else sample for sample in (baseline_ecdf, benchmark_ecdf)
+            )
 
     def _calculate_wasserstein_distance_statistics(self) -> float:
         """
         Computes the Wasserstein distance or Kantorovich–Rubinstein metric also known
         as the Earth mover's distance. This metric represents how much effort is needed
         to move the benchmark distribution towards the baseline.
+        Both distances are computed in one linear merge over the already sorted ECDF's.
         :return: Will return the Wasserstein metric as a float from a normalized distribution.
         """
-        wasserstein = wasserstein_distance(
-            self.sample_a["measure"].values,
-            self.sample_b["measure"].values
-        )
+        _, wasserstein = self._distance_statistics
         return round(wasserstein, 3)
 
     def _calculate_kolmogorov_smirnov_distance_statistics(self) -> tuple:
@@ -140,33 +206,80 @@ class StatisticalDistance:
         significant the change is between the 2 largest points.
         :return: Gives back the KS-test D-value & the P-Value
         """
-        kolmogorov_smirnov_distance, kolmogorov_smirnov_probability = ks_2samp(
-            self.sample_a["measure"].values,
-            self.sample_b["measure"].values
-        )
-        return round(kolmogorov_smirnov_distance, 3), kolmogorov_smirnov_probability
+        kolmogorov_smirnov_distance, _ = self._distance_statistics
+        return round(kolmogorov_smirnov_distance, 3), self._calculate_kolmogorov_smirnov_probability()
+
+    def _calculate_kolmogorov_smirnov_probability(self) -> float:
+        """
+        Will compute the kolmogorov smirnov p-value, the asymptotic p-value is computed from the
+        distance directly while the exact p-value is left to scipy.
+        The permutation p-value also stores the amount of permutations it is based on.
+        :return: The kolmogorov smirnov probability value
+        """
+        size_a, size_b = len(self.sample_a["measure"]), len(self.sample_b["measure"])
+        method = self.probability_method
+        if method == "auto":
+            method = "exact" if max(size_a, size_b) <= self.MAX_EXACT_PROBABILITY_SIZE else "asymp"
+
+        if method == "asymp":
+            kolmogorov_smirnov_distance, _ = self._distance_statistics
+            return kolmogorov_smirnov_asymptotic_probability(kolmogorov_smirnov_distance, size_a, size_b)
+
+        if method == "permutation":
+            probability, self.permutations = permutation_kolmogorov_smirnov_probability(
+                self.sample_a["measure"].values,
+                self.sample_b["measure"].values,
+                alpha=self.permutation_alpha,
+                max_permutations=self.max_permutations,
+                seed=self.SEED
+            )
+            return probability
+
+        return float(ks_2samp(self.sample_a["measure"].values, self.sample_b["measure"].values, method=method).pvalue)
 
     def _score_distance_statistics(self) -> float:
         """
         An heuristic that will estimate a score between 0 - 100 using the
         Wasserstein distance and the kolmogorov smirnov distance.
         It determines the distance by using defined boundaries to lower the score
-        if they are breached.
+        if they are breached, the breached punishments are looked up in the
+        cached cumulative punishments of the scoring matrix.
         Allowing for an more accurate threshold that can
         be used to decide if the change acceptable or not.
         :return: A score from 0 - 100 which can be interpret by a engineer.
         """
-        ks_score = 1
-        ws_score = 1
-        for boundary in self.SCORING_MATRIX:
-            if self._ws_d_value >= boundary["wasserstein_boundary"]:
-                ws_score -= boundary["punishment"]
-
-            if self._ks_d_value >= boundary["kolmogorov_smirnov_boundary"]:
-                ks_score -= boundary["punishment"]
-        score = abs(round(float(ks_score + ws_score) / 2 * 100, 2))
+        score = round(float(score_distances(self._ws_d_value, self._ks_d_value, self._scoring_matrix)), 2)
         return 1 if score == 0 else score
 
+    def _bootstrap_confidence_intervals(self, resamples: int, confidence_level: float, processes: int) -> dict:
+        """
+        Will estimate how much the distances and the score could move by chance, by resampling
+        the baseline and benchmark with replacement and comparing every resample.
+        The resampled distances are rounded and scored the same way as the distances themselves.
+        :param resamples: The amount of bootstrap resamples.
+        :param confidence_level: The confidence level of the intervals.
+        :param processes: The amount of worker processes.
+        :return: The lower and upper bound of the kolmogorov smirnov distance, the Wasserstein distance
+        and the score.
+        """
+        kolmogorov_smirnov_distances, wasserstein_distances = bootstrap_distance_statistics(
+            self.sample_a["measure"].values,
+            self.sample_b["measure"].values,
+            resamples=resamples,
+            seed=self.SEED,
+            processes=processes
+        )
+        kolmogorov_smirnov_distances = np.round(kolmogorov_smirnov_distances, 3)
+        wasserstein_distances = np.round(wasserstein_distances, 3)
+        scores = np.round(score_distances(wasserstein_distances, kolmogorov_smirnov_distances, self._scoring_matrix), 2)
+        scores[scores == 0] = 1
+
+        return {
+            "kolmogorov_smirnov_distance": confidence_interval(kolmogorov_smirnov_distances, confidence_level),
+            "wasserstein_distance": confidence_interval(wasserstein_distances, confidence_level),
+            "score": confidence_interval(scores, confidence_level)
+        }
+
     def _letter_rank_distance_statistics(self) -> str:
         """
         An heuristic that will estimate a rank of what the amount of change is
@@ -188,11 +301,4 @@ class StatisticalDistance:
         to document the automated release with an low performance risk.
         :return: The letter rank in the form as string ranging from S to F
         """
-        for grade in self.LETTER_RANKS:
-            ks_critical_grade = grade["kolmogorov_smirnov_boundary"]
-            wasserstein_critical_grade = grade["wasserstein_boundary"]
-            if self._ws_d_value < wasserstein_critical_grade and self._ks_d_value < ks_critical_grade:
-                return grade["rank"]
-            else:
-                continue
-        return "F"
+        return str(letter_rank_distances(self._ws_d_value, self._ks_d_value, self._letter_ranks))
@@ -1,5 +1,40 @@
+from heuristics.misc.helpers import calculate_percentiles
+from heuristics.misc.samples import SortedSample
+from itertools import accumulate
+from operator import sub
 import numpy as np
-from math import log2
+
+
+def _compile_belts(distribution: list) -> tuple:
+    """
+    Will turn the (ragged) percentile belts into a padded array.
+    The padding points to an extra value after the percentiles, when that value is 1 for
+    both populations the padding adds 1 * log2(1 / 1) = 0 to the divergence.
+    :param distribution: The percentiles of every belt.
+    :return: The flat percentiles and for every belt the position of its percentiles in the flat
+    percentiles, padded with the position right after the percentiles.
+    """
+    width = max(len(belt) for belt in distribution)
+    percentiles = np.array([percentile for belt in distribution for percentile in belt], dtype=np.float64)
+    positions = np.full((len(distribution), width), len(percentiles), dtype=np.int64)
+    offset = 0
+    for row, belt in enumerate(distribution):
+        positions[row, :len(belt)] = np.arange(offset, offset + len(belt))
+        offset += len(belt)
+    return percentiles, positions
+
+
+def _compile_scoring_matrix(scoring_matrix: list) -> tuple:
+    """
+    Will turn the scoring matrix into ascending boundaries and the score that remains
+    after the first i punishments have been subtracted.
+    :param scoring_matrix: The boundaries and punishments.
+    :return: The boundaries and the remaining scores.
+    """
+    boundaries = np.array([row["boundary"] for row in scoring_matrix], dtype=np.float64)
+    remaining_scores = np.array(list(accumulate([row["punishment"] for row in scoring_matrix], sub, initial=1)),
+                                dtype=np.float64)
+    return boundaries, remaining_scores
 
 
 class DivergenceTest:
@@ -88,33 +123,93 @@ class DivergenceTest:
         {"boundary": 0.775, "punishment": 0.15592140},
 
     ]
+    # The array forms of the tables above.
+    _PERCENTILES, _BELT_POSITIONS = _compile_belts(DISTRIBUTION)
+    _LETTER_BOUNDARIES = np.array([grade["boundary"] for grade in LETTER_RANKS], dtype=np.float64)
+    _SCORING_BOUNDARIES, _REMAINING_SCORES = _compile_scoring_matrix(SCORING_MATRIX)
 
     def __init__(self, population_a: list, population_b: list) -> None:
         """
         Will construct the class and calculate all the required statistics.
 
-        :param population_a: An list of floats of the A population (baseline).
-        :param population_b: An list of floats of the B population (benchmark).
+        :param population_a: An list of floats of the A population (baseline) or its SortedSample.
+        :param population_b: An list of floats of the B population (benchmark) or its SortedSample.
         """
-        self.sample_a = self._discretely_approximate_the_probability_distribution(population_a)
-        self.sample_b = self._discretely_approximate_the_probability_distribution(population_b)
+        self._set_percentiles(self._calculate_percentiles(population_a), self._calculate_percentiles(population_b))
         self.d_value, self.absolute_change = self._estimate_d_value()
         self.rank = self._letter_rank_d_value()
         self.score = self._score_c_value_from_0_to_100()
 
-    def _discretely_approximate_the_probability_distribution(self, data: list) -> list:
+    @classmethod
+    def batch(cls, populations_a: list, populations_b: list) -> list:
+        """
+        Will compare many pairs of populations at once, every step after the percentiles
+        is computed for all pairs together.
+        :param populations_a: The A populations (baselines), lists of floats or SortedSamples.
+        :param populations_b: The B populations (benchmarks), lists of floats or SortedSamples.
+        :return: A DivergenceTest for every pair.
         """
-        Will calculate the required percentile range for each slice of data.
+        if len(populations_a) != len(populations_b):
+            raise ValueError("Every A population needs a B population.")
+        if len(populations_a) == 0:
+            return []
+
+        percentiles_a = np.array([cls._calculate_percentiles(population) for population in populations_a])
+        percentiles_b = np.array([cls._calculate_percentiles(population) for population in populations_b])
+        divergences = np.abs(cls._calculate_kl_divergence(cls._pad(percentiles_a), cls._pad(percentiles_b)))
+        d_values = cls._calculate_d_values(divergences)
+        ranks = cls._letter_rank_d_values(d_values)
+        scores = cls._score_changes(divergences)
+
+        tests = []
+        for position in range(len(populations_a)):
+            test = cls.__new__(cls)
+            test._set_percentiles(percentiles_a[position], percentiles_b[position])
+            test.d_value, test.absolute_change = float(d_values[position]), divergences[position].tolist()
+            test.rank, test.score = str(ranks[position]), float(scores[position])
+            tests.append(test)
+        return tests
+
+    @classmethod
+    def _calculate_percentiles(cls, data) -> np.ndarray:
+        """
+        Will calculate the percentiles of every belt in one go.
+        A SortedSample is not sorted again.
         :return: An array containing the calculated percentiles.
         """
-        percentile_ranges = []
-        for belt in self.DISTRIBUTION:
-            group = []
-            for percentile in belt:
-                group.append(self._calculate_percentile(data, percentile))
-            percentile_ranges.append(group)
+        if isinstance(data, SortedSample):
+            return data.percentiles(cls._PERCENTILES)
+        return calculate_percentiles(data, cls._PERCENTILES)
 
-        return percentile_ranges
+    @classmethod
+    def _pad(cls, percentiles: np.ndarray) -> np.ndarray:
+        """
+        Will arrange the percentiles into padded belts, the padding is 1.
+        :param percentiles: The percentiles of one or many populations, percentiles on the last axis.
+        :return: The belts, an array of shape (..., belts, belt width).
+        """
+        padding = np.ones(percentiles.shape[:-1] + (1,), dtype=np.float64)
+        return np.concatenate((percentiles, padding), axis=-1)[..., cls._BELT_POSITIONS]
+
+    def _set_percentiles(self, percentiles_a: np.ndarray, percentiles_b: np.ndarray) -> None:
+        """
+        Will store the percentiles of both populations, per belt and as padded belt arrays.
+        :param percentiles_a: The percentiles of the A population.
+        :param percentiles_b: The percentiles of the B population.
+        """
+        self._belts_a = self._pad(percentiles_a)
+        self._belts_b = self._pad(percentiles_b)
+        self.sample_a = self._discretely_approximate_the_probability_distribution(percentiles_a)
+        self.sample_b = self._discretely_approximate_the_probability_distribution(percentiles_b)
+
+    def _discretely_approximate_the_probability_distribution(self, percentiles: np.ndarray) -> list:
+        """
+        Will split the percentiles into their belts.
+        :param percentiles: The percentiles of every belt.
+        :return: A list with the percentiles per belt.
+        """
+        percentiles = iter(percentiles.tolist())
+        return [[next(percentiles) for _ in belt] for belt in self.DISTRIBUTION]
 
     @staticmethod
     def _calculate_percentile(array: list, percentile: int) -> float:
@@ -125,7 +220,7 @@ class DivergenceTest:
         return float(np.percentile(array, percentile))
 
     @staticmethod
-    def _calculate_kl_divergence(p: list, q: list) -> float:
+    def _calculate_kl_divergence(p, q):
         """
         the Kullback–Leibler divergence is used to represent a measure of
         distance between a percentile range from A to B.
@@ -133,20 +228,59 @@ class DivergenceTest:
 
         https://en.wikipedia.org/wiki/Kullback%E2%80%93Leibler_divergence
 
+        The divergence is computed over the last axis, so any amount of
+        (padded) belts can be computed at once.
+
         :param p: The true distribution (Baseline)
         :param q: Is the approximate distribution Q (Benchmark)
-        :return: The estimated distance from P to Q
-        :except: ValueError or ZeroDivisionError: When a negative number is inside the
-        log function or a zero value, a forced output of 100 will be given to represent
-        the large change.
+        :return: The estimated distance from P to Q, a float for one belt or else an array.
+        When a value of Q is zero or the ratio P / Q is not positive (the logarithm is undefined)
+        a forced output of 100 will be given to represent the large change.
+        """
+        p = np.asarray(p, dtype=np.float64)
+        q = np.asarray(q, dtype=np.float64)
+
+        zero = q == 0
+        ratio = p / np.where(zero, 1, q)
+        invalid = zero | ~(ratio > 0)
+        terms = p * np.log2(np.where(invalid, 1, ratio))
+
+        # A sequential sum, the same order as adding the terms one by one.
+        divergence = np.cumsum(terms, axis=-1)[..., -1]
+        divergence = np.where(np.any(invalid, axis=-1), 100, divergence)
+        return float(divergence) if divergence.ndim == 0 else divergence
+
+    @staticmethod
+    def _calculate_d_values(divergences: np.ndarray) -> np.ndarray:
+        """
+        Will combine the absolute divergence of every belt into the d-value,
+        the sum of the divergences plus their standard deviation.
+        :param divergences: The absolute divergences, belts on the last axis.
+        :return: The d-value(s).
+        """
+        return np.cumsum(divergences, axis=-1)[..., -1] + np.std(divergences, axis=-1)
+
+    @classmethod
+    def _letter_rank_d_values(cls, d_values) -> np.ndarray:
+        """
+        Will letter rank one or many d-values, the first grade whose boundary is not reached.
+        :param d_values: The d-value(s).
+        :return: The letter rank(s).
         """
-        try:
-            return sum(p[i] * log2(p[i] / q[i]) for i in range(len(p)))
+        letters = np.array([grade["letter"] for grade in cls.LETTER_RANKS] + ["F"])
+        return letters[np.searchsorted(cls._LETTER_BOUNDARIES, d_values, side="right")]
 
-        except (ValueError, ZeroDivisionError):
-            # Possible negative number inside log function or a zero value -
-            # this is only possible at extreme differences on the negative axis.
-            return 100
+    @classmethod
+    def _score_changes(cls, changes: np.ndarray) -> np.ndarray:
+        """
+        Will score the absolute divergences of the belts from 0 to 100.
+        Every boundary a change exceeds subtracts its punishment, which is a lookup
+        of the remaining score after the amount of exceeded boundaries.
+        :param changes: The absolute divergences, belts on the last axis.
+        :return: The rounded score(s).
+        """
+        scores = cls._REMAINING_SCORES[np.searchsorted(cls._SCORING_BOUNDARIES, changes, side="left")]
+        return np.round(np.cumsum(scores, axis=-1)[..., -1] / scores.shape[-1] * 100, 2)
 
     def _estimate_d_value(self) -> tuple:
         """
@@ -164,13 +298,10 @@ class DivergenceTest:
         :return: A float which represent the change from A to B
         and a list of change per percentile range
         """
-        divergence_per_percentile_range = []
-        for A, B in zip(self.sample_a, self.sample_b):
-            divergence_per_percentile_range.append(
-                abs(self._calculate_kl_divergence(A, B))
-            )
-        c = sum(divergence_per_percentile_range) + np.std(divergence_per_percentile_range)
-        return c, divergence_per_percentile_range
+        divergence_per_percentile_range = np.abs(
+            self._calculate_kl_divergence(self._belts_a, self._belts_b)
+        )
+        return float(self._calculate_d_values(divergence_per_percentile_range)), divergence_per_percentile_range.tolist()
 
     def _letter_rank_d_value(self) -> str:
         """
@@ -186,12 +317,7 @@ class DivergenceTest:
 
         :return: The letter rank in the form as string ranging from S to F
         """
-        for grade in self.LETTER_RANKS:
-            if self.d_value < grade["boundary"]:
-                return grade["letter"]
-            else:
-                continue
-        return "F"
+        return str(self._letter_rank_d_values(self.d_value))
 
     def _score_c_value_from_0_to_100(self) -> float:
         """
@@ -202,13 +328,4 @@ class DivergenceTest:
         :return: returns a float representing the
         change in a logical score.
         """
-        scored_ranges = []
-        for change in self.absolute_change:
-            score = 1
-            for row in self.SCORING_MATRIX:
-                if change > row["boundary"]:
-                    score -= row["punishment"]
-                else:
-                    continue
-            scored_ranges.append(score)
-        return round(sum(scored_ranges) / len(scored_ranges) * 100, 2)
+        return float(self._score_changes(np.asarray(self.absolute_change)))
@@ -1,3 +1,4 @@
+from heuristics.misc.instrumentation import stage
 import pandas as pd
 import numpy as np
 import math
@@ -21,20 +22,47 @@ def calculate_percentage_change(old: float, new: float) -> float:
         return 0.00
 
 
-def normalize_array(data: list, percentile: float) -> np.array:
+def calculate_percentiles(data: list, percentiles: list, presorted: bool = False) -> np.ndarray:
+    """
+    Will calculate a whole vector of percentiles by sorting the data only once.
+    The percentiles are linearly interpolated the same way np.percentile does it,
+    so the outcome is identical to calling np.percentile for every percentile.
+    param data: A list or array of raw measurements.
+    param percentiles: The percentiles between 0 and 100 that need to be calculated.
+    param presorted: True when the data is already sorted in ascending order.
+    :return: An array containing the calculated percentiles.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    data = data if presorted else np.sort(data)
+    quantiles = np.true_divide(np.asarray(percentiles, dtype=np.float64), 100)
+
+    virtual_indexes = quantiles * (data.size - 1)
+    lower_indexes = np.floor(virtual_indexes).astype(np.intp)
+    upper_indexes = np.minimum(lower_indexes + 1, data.size - 1)
+    weights = virtual_indexes - lower_indexes
+
+    # Same interpolation as NumPy, which works from the closest side to stay exact.
+    lower, upper = data[lower_indexes], data[upper_indexes]
+    difference = upper - lower
+    return np.where(weights >= 0.5, upper - difference * (1 - weights), lower + difference * weights)
+
+
+def normalize_array(data: list, percentile: float, cutoff: float = None) -> np.array:
     """
     Will normalize a given raw distribution to its maximum.
     param data: A list of raw measurements that need to be normalized.
     param percentile: the percentile cut-off point of the data everything below this point
     will be excluded from normalisation
+    param cutoff: An already known value of the percentile (for example estimated by a
+    quantile sketch), when given the percentile is not computed over the data.
     :return: An normalized list of data.
     """
-    percentile = np.percentile(data, percentile)
-    data = [value for value in data if value <= percentile]
-    return np.array(data)
+    data = np.asarray(data)
+    cutoff = np.percentile(data, percentile) if cutoff is None else cutoff
+    return data[data <= cutoff]
 
 
-def calculate_ecdf(normalized_sample: tuple) -> pd.DataFrame:
+def calculate_ecdf(normalized_sample: tuple, presorted: bool = False, timings: dict = None) -> pd.DataFrame:
     """
     Will calculate the eCDF to find the empirical distribution of our population.
     This function will then create a dataframe which will contain the measure
@@ -44,14 +72,18 @@ def calculate_ecdf(normalized_sample: tuple) -> pd.DataFrame:
     More info about empirical cumulative distribution functions can be found here:
     https://en.wikipedia.org/wiki/Empirical_distribution_function
     :param normalized_sample: A normalized list of measurements
+    :param presorted: True when the normalized sample is already sorted in ascending order.
+    :param timings: The timings mapping the "ecdf" stage is recorded in when instrumentation is enabled,
+    None to not measure it.
     :return: a data frame containing the ECDF
     """
-    return pd.DataFrame(
-        {
-            'measure': np.sort(normalized_sample),
-            'probability': np.arange(len(normalized_sample)) / float(len(normalized_sample)),
-        }
-    ).fillna(0.00)
+    with stage(timings, "ecdf", samples=len(normalized_sample)):
+        return pd.DataFrame(
+            {
+                'measure': np.asarray(normalized_sample) if presorted else np.sort(normalized_sample),
+                'probability': np.arange(len(normalized_sample)) / float(len(normalized_sample)),
+            }
+        ).fillna(0.00)
 
 
 def validate_thresholds_on_given_value(change: float, thresholds: dict) -> bool:
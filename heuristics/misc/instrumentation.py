@@ -0,0 +1,127 @@
+# coding=utf-8
+from collections import namedtuple
+import tracemalloc
+import time
+
+# The measurements of one stage, allocated_bytes is None unless memory tracing is enabled.
+StageTiming = namedtuple("StageTiming", ["stage", "seconds", "samples", "allocated_bytes"])
+
+# The instrumentation state of this process, it is disabled by default.
+_ENABLED = False
+_TRACER = None
+_TRACE_MEMORY = False
+_STARTED_TRACEMALLOC = False
+
+# The stages that are currently being measured, used to carry the memory peak of nested stages outwards.
+_ACTIVE_STAGES = []
+
+
+def enable_instrumentation(tracer=None, trace_memory: bool = False) -> None:
+    """
+    Will start recording the wall time and sample count of every instrumented stage.
+    :param tracer: An optional callable that is called with the StageTiming of every finished stage.
+    :param trace_memory: When True the peak amount of bytes allocated within every stage is also
+    recorded with tracemalloc, which is started when it is not tracing yet.
+    Keep in mind that tracemalloc slows down every allocation.
+    """
+    global _ENABLED, _TRACER, _TRACE_MEMORY, _STARTED_TRACEMALLOC
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _STARTED_TRACEMALLOC = True
+    _ENABLED, _TRACER, _TRACE_MEMORY = True, tracer, trace_memory
+
+
+def disable_instrumentation() -> None:
+    """
+    Will stop recording stages, tracemalloc is only stopped when it was started by enable_instrumentation.
+    """
+    global _ENABLED, _TRACER, _TRACE_MEMORY, _STARTED_TRACEMALLOC
+    if _STARTED_TRACEMALLOC:
+        tracemalloc.stop()
+        _STARTED_TRACEMALLOC = False
+    _ENABLED, _TRACER, _TRACE_MEMORY = False, None, False
+
+
+def instrumentation_enabled() -> bool:
+    """
+    :return: True when stages are being recorded.
+    """
+    return _ENABLED
+
+
+class _DisabledStage:
+    """
+    The stage that is handed out while instrumentation is disabled, it does nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback) -> bool:
+        return False
+
+    def __setattr__(self, key, value) -> None:
+        pass
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+class _Stage:
+    """
+    Will measure one stage and store its StageTiming in the timings of the result it belongs to.
+    """
+    __slots__ = ("name", "samples", "_timings", "_start", "_memory_start", "_memory_peak")
+
+    def __init__(self, timings: dict, name: str, samples: int) -> None:
+        self.name = name
+        self.samples = samples
+        self._timings = timings
+
+    def __enter__(self):
+        if _TRACE_MEMORY and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if _ACTIVE_STAGES:
+                _ACTIVE_STAGES[-1]._memory_peak = max(_ACTIVE_STAGES[-1]._memory_peak, peak)
+            tracemalloc.reset_peak()
+            self._memory_start = self._memory_peak = current
+            _ACTIVE_STAGES.append(self)
+        else:
+            self._memory_start = None
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback) -> bool:
+        seconds = time.perf_counter() - self._start
+        allocated_bytes = None
+        if self._memory_start is not None:
+            _ACTIVE_STAGES.remove(self)
+            if tracemalloc.is_tracing():
+                self._memory_peak = max(self._memory_peak, tracemalloc.get_traced_memory()[1])
+            allocated_bytes = self._memory_peak - self._memory_start
+            if _ACTIVE_STAGES:
+                _ACTIVE_STAGES[-1]._memory_peak = max(_ACTIVE_STAGES[-1]._memory_peak, self._memory_peak)
+
+        if exception_type is None:
+            timing = StageTiming(self.name, seconds, self.samples, allocated_bytes)
+            self._timings[self.name] = timing
+            if _TRACER is not None:
+                _TRACER(timing)
+        return False
+
+
+def stage(timings: dict, name: str, samples: int = None):
+    """
+    Will give back a context manager that measures a stage of a computation.
+    While instrumentation is disabled, or when there are no timings to record the stage in,
+    a shared stage that does nothing is given back, so an instrumented hot path only pays for this call.
+    The sample count can also be set on the stage within the block when it is only known afterwards.
+    :param timings: The timings mapping of the result the stage belongs to, None to not measure the stage.
+    :param name: The name of the stage.
+    :param samples: The amount of samples the stage works on.
+    :return: The stage context manager.
+    """
+    if not _ENABLED or timings is None:
+        return _DISABLED_STAGE
+    return _Stage(timings, name, samples)
@@ -0,0 +1,59 @@
+# coding=utf-8
+from scipy.stats import distributions
+import numpy as np
+import math
+
+
+def merge_sorted_samples(sample_a: np.ndarray, sample_b: np.ndarray) -> tuple:
+    """
+    Will merge two samples that are already sorted into one sorted sequence.
+    A stable sort of two concatenated sorted runs is a single linear merge (timsort),
+    so this costs O(n + m) instead of sorting both samples again.
+    :param sample_a: The sorted A population (baseline).
+    :param sample_b: The sorted B population (benchmark).
+    :return: The merged values and for every merged value how many measurements
+    of sample A and of sample B are smaller or equal to it (up to that position).
+    """
+    sample_a = np.asarray(sample_a, dtype=np.float64)
+    sample_b = np.asarray(sample_b, dtype=np.float64)
+    merged = np.concatenate((sample_a, sample_b))
+    order = np.argsort(merged, kind="stable")
+    from_sample_a = order < sample_a.size
+    return merged[order], np.cumsum(from_sample_a), np.cumsum(~from_sample_a)
+
+
+def calculate_distance_statistics(sample_a: np.ndarray, sample_b: np.ndarray) -> tuple:
+    """
+    Will compute the kolmogorov smirnov and the Wasserstein distance in one pass
+    over the merged ECDF's of two sorted samples.
+    :param sample_a: The sorted A population (baseline).
+    :param sample_b: The sorted B population (benchmark).
+    :return: The kolmogorov smirnov distance and the Wasserstein distance (not rounded).
+    """
+    size_a, size_b = len(sample_a), len(sample_b)
+    values, counts_a, counts_b = merge_sorted_samples(sample_a, sample_b)
+
+    # Tied values are only fully counted at the last element of a tie.
+    # The ECDF gap is kept as an integer (a multiple of 1 / lcm) so the distance is exact.
+    last_of_tie = np.append(values[1:] != values[:-1], True)
+    greatest_common_divisor = math.gcd(size_a, size_b)
+    gaps = np.abs(counts_a[last_of_tie] * size_b - counts_b[last_of_tie] * size_a) // greatest_common_divisor
+    kolmogorov_smirnov_distance = int(np.max(gaps)) / ((size_a // greatest_common_divisor) * size_b)
+
+    # Within a tie the width is zero, so only the steps between distinct values contribute.
+    differences = np.abs(counts_a[:-1] / size_a - counts_b[:-1] / size_b)
+    wasserstein_distance = float(np.dot(differences, np.diff(values)))
+    return kolmogorov_smirnov_distance, wasserstein_distance
+
+
+def kolmogorov_smirnov_asymptotic_probability(distance: float, size_a: int, size_b: int) -> float:
+    """
+    The two-sided asymptotic p-value of the two sample kolmogorov smirnov test,
+    the same approximation scipy.stats.ks_2samp uses for large samples.
+    :param distance: The kolmogorov smirnov distance (not rounded).
+    :param size_a: The amount of measurements in sample A.
+    :param size_b: The amount of measurements in sample B.
+    :return: The kolmogorov smirnov probability value
+    """
+    effective_size = float(size_a) * float(size_b) / (float(size_a) + float(size_b))
+    return float(np.clip(distributions.kstwo.sf(distance, np.round(effective_size)), 0, 1))
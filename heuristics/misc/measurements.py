@@ -1,5 +1,8 @@
 # coding=utf-8
-from heuristics.misc.helpers import normalize_array, calculate_ecdf
+from heuristics.misc.helpers import normalize_array, calculate_ecdf, calculate_percentiles
+from heuristics.misc.sketches import QuantileSketch
+from heuristics.misc.samples import SortedSample
+from heuristics.misc.instrumentation import stage
 
 import numpy as np
 import pandas as pd
@@ -7,18 +10,26 @@ import pandas as pd
 
 class Measurements:
 
-    def __init__(self, data: list, perc: float = 95):
+    def __init__(self, data: list, perc: float = 95, sketch_accuracy: float = None):
         """
         Will load in the object and map the object arguments to attributes.
         These attributes ares used to identify the data.
 
-        :param data: the raw data.
+        :param data: the raw data, a list or a (memory-mapped) NumPy array.
+        :param perc: The percentile cut-off point used to normalize the data.
+        :param sketch_accuracy: When given the percentiles, the normalization cut-off and
+        the outlier threshold are estimated by a quantile sketch with this rank error
+        instead of being computed exactly.
         """
         super(Measurements, self).__init__()
 
         # Arguments
         self._provided_measurements = data
         self._percentile = perc
+        self._sketch_accuracy = sketch_accuracy
+
+        # The StageTiming of every computed stage, only filled while instrumentation is enabled.
+        self.timings = {}
 
     @property
     def raw(self) -> list:
@@ -35,9 +46,14 @@ class Measurements:
     def raw(self, value: list) -> None:
         """
         For transactional object collection the raw data needs to be appended a lot.
+        Array backed measurements (for example a memory-mapped run) are concatenated
+        instead of added element wise.
         :param value: additional measurements that need to be added to the object
         """
-        self._provided_measurements += value
+        if isinstance(self._provided_measurements, np.ndarray) or isinstance(value, np.ndarray):
+            self._provided_measurements = np.concatenate((self._provided_measurements, value))
+        else:
+            self._provided_measurements += value
 
     @property
     def normalized(self) -> tuple:
@@ -49,9 +65,38 @@ class Measurements:
         :return:
         """
         if "_normalized_" not in self.__dict__.keys():
-            self.__dict__["_normalized_"] = normalize_array(self.raw, self._percentile)
+            cutoff = None if self.sketch is None else self.sketch.percentile(self._percentile)
+            with stage(self.timings, "normalization", samples=len(self.raw)):
+                self.__dict__["_normalized_"] = normalize_array(self.raw, self._percentile, cutoff=cutoff)
         return self.__dict__["_normalized_"]
 
+    @property
+    def sorted_sample(self) -> SortedSample:
+        """
+        The raw data as an immutable sorted sample that can be handed to every heuristic,
+        so the data is sorted only once per comparison.
+        :return: The sorted sample of the raw data.
+        """
+        if "_sorted_sample_" not in self.__dict__.keys():
+            with stage(self.timings, "sorting", samples=len(self.raw)):
+                self.__dict__["_sorted_sample_"] = SortedSample(self.raw, perc=self._percentile)
+        return self.__dict__["_sorted_sample_"]
+
+    @property
+    def sketch(self) -> QuantileSketch:
+        """
+        The optional quantile sketch of the raw data.
+        :return: The sketch or None when exact percentiles are used.
+        """
+        if self._sketch_accuracy is None:
+            return None
+
+        if "_sketch_" not in self.__dict__.keys():
+            with stage(self.timings, "sketch", samples=len(self.raw)):
+                self.__dict__["_sketch_"] = QuantileSketch(accuracy=self._sketch_accuracy)
+                self.__dict__["_sketch_"].update(self.raw)
+        return self.__dict__["_sketch_"]
+
     @property
     def ecdf(self) -> pd.DataFrame:
         """
@@ -68,7 +113,7 @@ class Measurements:
         :return: The empirical cumulative distribution function (outliers filtered or not filtered)
         """
         if "_ecdf_" not in self.__dict__.keys():
-            self.__dict__["_ecdf_"] = calculate_ecdf(normalized_sample=self.normalized)
+            self.__dict__["_ecdf_"] = calculate_ecdf(normalized_sample=self.normalized, timings=self.timings)
             # sample[~(sample['probability'] >= 0.95)]
         return self.__dict__["_ecdf_"]
 
@@ -100,10 +145,21 @@ class Measurements:
         :return:A dataframe with outliers
         """
         if "_outliers_" not in self.__dict__.keys():
-            percentile = np.percentile(self.raw, 95)
-            self.__dict__["_outliers_"] = [value for value in self.raw if value >= percentile]
+            self.__dict__["_outliers_"] = [value for value in self.raw if value >= self.outlier_threshold]
         return self.__dict__["_outliers_"]
 
+    @property
+    def outlier_threshold(self) -> float:
+        """
+        The 95th percentile from which a measurement is considered an outlier.
+        :return: A float which is the outlier threshold.
+        """
+        if "_outlier_threshold_" not in self.__dict__.keys():
+            self.__dict__["_outlier_threshold_"] = float(
+                np.percentile(self.raw, 95) if self.sketch is None else self.sketch.percentile(95)
+            )
+        return self.__dict__["_outlier_threshold_"]
+
     @property
     def max(self) -> float:
         """
@@ -112,7 +168,7 @@ class Measurements:
         :return: A float that is the maximum number.
         """
         if "_max_" not in self.__dict__.keys():
-            self.__dict__["_max_"] = float(max(self.raw))
+            self.__dict__["_max_"] = float(np.max(self.raw))
         return self.__dict__["_max_"]
 
     @property
@@ -123,7 +179,7 @@ class Measurements:
         :return: A float that is the maximum number.
         """
         if "_min_" not in self.__dict__.keys():
-            self.__dict__["_min_"] = float(min(self.raw))
+            self.__dict__["_min_"] = float(np.min(self.raw))
         return self.__dict__["_min_"]
 
     @property
@@ -154,12 +210,11 @@ class Measurements:
         Will calculate a pre-defined set of percentiles from the raw data.
         :return: Will return the percentile measurement as a tuple.
         """
-        if "_percentiles_" not in self.__dict__.keys():
-            self.__dict__["_percentiles_"] = []
-            for percentile in range(1, 100):
-                self.__dict__["_percentiles_"].append(
-                    float(np.percentile(np.array(self.raw), percentile))
-                )
+        if "_percentiles_" not in self.__dict__.keys() and self.sketch is not None:
+            self.__dict__["_percentiles_"] = self.sketch.percentiles(range(1, 100)).tolist()
+
+        elif "_percentiles_" not in self.__dict__.keys():
+            self.__dict__["_percentiles_"] = calculate_percentiles(self.raw, range(1, 100)).tolist()
         return self.__dict__["_percentiles_"]
 
     @property
@@ -184,5 +239,204 @@ class Measurements:
         of all measurements.
         """
         if "_sum_" not in self.__dict__.keys():
-            self.__dict__["_sum_"] = sum(self.raw)
+            self.__dict__["_sum_"] = float(np.sum(self.raw))
         return self.__dict__["_sum_"]
+
+
+class StreamingMeasurements:
+
+    def __init__(self, chunks=None, perc: float = 95, sketch_accuracy: float = None) -> None:
+        """
+        Will summarize measurements that arrive in chunks without keeping the raw data.
+        All statistics are kept up to date in a single pass by merging the mean
+        and variance of every chunk into the running totals (Welford / Chan et al.).
+        This makes it possible to summarize runs that do not fit in memory.
+
+        :param chunks: An optional iterable of chunks (lists or arrays) of measurements,
+        for example the chunks coming from the csv chunk reader.
+        :param perc: The percentile cut-off point used to normalize the data.
+        :param sketch_accuracy: When given a quantile sketch with this rank error is kept
+        so percentiles can be estimated from a few KB of state.
+        """
+        super(StreamingMeasurements, self).__init__()
+        self._percentile = perc
+        self.sketch = None if sketch_accuracy is None else QuantileSketch(accuracy=sketch_accuracy)
+        self._count = 0
+        self._sum = 0.0
+        self._mean = 0.0
+        self._squared_distance = 0.0
+        self._min = float("inf")
+        self._max = float("-inf")
+        if chunks is not None:
+            self.update_from_chunks(chunks)
+
+    def update(self, chunk) -> None:
+        """
+        Will merge one chunk of measurements into the running statistics.
+        :param chunk: A list or array of measurements.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.size == 0:
+            return
+
+        if self.sketch is not None:
+            self.sketch.update(chunk)
+
+        chunk_mean = float(np.mean(chunk))
+        self._merge(
+            count=int(chunk.size),
+            total=float(np.sum(chunk)),
+            mean=chunk_mean,
+            squared_distance=float(np.sum(np.square(chunk - chunk_mean))),
+            minimum=float(np.min(chunk)),
+            maximum=float(np.max(chunk))
+        )
+
+    def update_from_chunks(self, chunks) -> None:
+        """
+        Will consume an iterable of chunks one chunk at the time.
+        :param chunks: An iterable of lists or arrays of measurements.
+        """
+        for chunk in chunks:
+            self.update(chunk)
+
+    def merge(self, other: "StreamingMeasurements") -> None:
+        """
+        Will merge the running statistics of another stream into this one.
+        Useful when separate chunks or load injectors are summarized in parallel.
+        Both streams need to keep a quantile sketch or neither, otherwise the percentiles
+        would only describe part of the merged stream.
+        :param other: Another streaming measurements object.
+        """
+        if other.count == 0:
+            return
+
+        if (self.sketch is None) != (other.sketch is None):
+            raise ValueError("Only one of the streams keeps a quantile sketch, both or neither should keep one.")
+
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+        self._merge(
+            count=other._count,
+            total=other._sum,
+            mean=other._mean,
+            squared_distance=other._squared_distance,
+            minimum=other._min,
+            maximum=other._max
+        )
+
+    def _merge(self, count: int, total: float, mean: float, squared_distance: float,
+               minimum: float, maximum: float) -> None:
+        """
+        Will combine a partial summary with the running summary.
+        """
+        combined_count = self._count + count
+        difference = mean - self._mean
+        self._mean += difference * count / combined_count
+        self._squared_distance += squared_distance + difference ** 2 * self._count * count / combined_count
+        self._count = combined_count
+        self._sum += total
+        self._min = min(self._min, minimum)
+        self._max = max(self._max, maximum)
+
+    @property
+    def average(self) -> float:
+        """
+        The average metric calculated over all of the measurements.
+        :return: a float that represents the average of the sample
+        """
+        return round(self._mean, 2)
+
+    @property
+    def mean(self) -> float:
+        """
+        The (unrounded) running mean over all of the measurements.
+        :return: a float that represents the average of the sample
+        """
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        """
+        The population variance over all of the measurements.
+        :return: A float which is the variance.
+        """
+        return self._squared_distance / self._count if self._count else 0.0
+
+    @property
+    def standard_deviation(self) -> float:
+        """
+        Will calculate the standard deviation over
+        all of the measurements that have been streamed.
+        :return: A float which is the standard deviation.
+        """
+        return float(np.sqrt(self.variance))
+
+    @property
+    def max(self) -> float:
+        """
+        The maximum of all of the measurements that have been streamed.
+        :return: A float that is the maximum number.
+        """
+        return self._max
+
+    @property
+    def min(self) -> float:
+        """
+        The minimum of all of the measurements that have been streamed.
+        :return: A float that is the minimum number.
+        """
+        return self._min
+
+    @property
+    def count(self) -> int:
+        """
+        Will count how many measurements have been streamed.
+        In the performance engineering context this
+        count is considered the throughput of a performance test.
+        :return: Will return an integer representing the count.
+        """
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """
+        This total amount of all of the measurement combined.
+        :return: returns a float representing the total sum
+        of all measurements.
+        """
+        return self._sum
+
+    def _verify_sketch(self) -> QuantileSketch:
+        """
+        Percentiles can only be estimated when a sketch is kept.
+        :return: The quantile sketch.
+        """
+        if self.sketch is None:
+            raise ValueError("Percentiles of streamed measurements require a sketch_accuracy.")
+        return self.sketch
+
+    @property
+    def percentiles(self) -> list:
+        """
+        Will estimate the 1st to the 99th percentile from the quantile sketch.
+        :return: Will return the percentile measurements as a list.
+        """
+        return self._verify_sketch().percentiles(range(1, 100)).tolist()
+
+    @property
+    def normalization_cutoff(self) -> float:
+        """
+        The estimated percentile from which measurements are excluded from normalization.
+        :return: A float which is the cut-off point.
+        """
+        return self._verify_sketch().percentile(self._percentile)
+
+    @property
+    def outlier_threshold(self) -> float:
+        """
+        The estimated 95th percentile from which a measurement is considered an outlier.
+        :return: A float which is the outlier threshold.
+        """
+        return self._verify_sketch().percentile(95)
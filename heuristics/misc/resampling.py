@@ -0,0 +1,228 @@
+# coding=utf-8
+from heuristics.misc.kernels import merge_sorted_samples
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats
+import numpy as np
+import math
+import os
+
+# The upper bound of the amount of cells (resamples x distinct values) one batch works on.
+BATCH_CELLS = 2000000
+
+# A sample with at least this many measurements per distinct value is resampled with a multinomial draw.
+MULTINOMIAL_TIE_RATIO = 10
+
+# The merged grid of the worker process, shared once per worker instead of once per batch.
+_WORKER_GRID = None
+
+
+def _initialize_worker(grid: tuple) -> None:
+    """
+    Will store the merged grid in the worker process.
+    :param grid: The distinct values and the grid positions of both samples.
+    """
+    global _WORKER_GRID
+    _WORKER_GRID = grid
+
+
+def merge_into_grid(sample_a: np.ndarray, sample_b: np.ndarray) -> tuple:
+    """
+    Will merge two sorted samples into a grid of their distinct values.
+    :param sample_a: The sorted A population (baseline).
+    :param sample_b: The sorted B population (benchmark).
+    :return: The distinct values and for every measurement of sample A and of sample B
+    the position of its value on the grid.
+    """
+    values, _, _ = merge_sorted_samples(sample_a, sample_b)
+    values = values[np.append(values[1:] != values[:-1], True)]
+    return values, np.searchsorted(values, sample_a), np.searchsorted(values, sample_b)
+
+
+def _draws_multinomial(size: int, grid_size: int) -> bool:
+    """
+    Will decide how a sample is resampled, with many ties (a small grid) drawing the counts
+    of every value from a multinomial distribution is cheaper than drawing every measurement.
+    :param size: The size of the sample.
+    :param grid_size: The amount of distinct values on the grid.
+    :return: True when the counts are drawn from a multinomial distribution.
+    """
+    return size >= MULTINOMIAL_TIE_RATIO * grid_size
+
+
+def _resample_onto_grid(generator: np.random.Generator, positions: np.ndarray, grid_size: int,
+                        resamples: int) -> np.ndarray:
+    """
+    Will draw bootstrap resamples (with replacement) of a sample and count how many
+    measurements of every resample fall on each value of the grid.
+    Counting keeps the values in order, so a resample never has to be sorted.
+    :param generator: The random generator.
+    :param positions: The position on the grid of every measurement of the sample.
+    :param grid_size: The amount of distinct values on the grid.
+    :param resamples: The amount of resamples.
+    :return: The counts, shape (resamples, grid size).
+    """
+    if _draws_multinomial(positions.size, grid_size):
+        frequencies = np.bincount(positions, minlength=grid_size) / positions.size
+        return generator.multinomial(positions.size, frequencies, size=resamples)
+
+    offsets = np.arange(resamples, dtype=np.int64)[:, np.newaxis] * grid_size
+    picked = positions[generator.integers(0, positions.size, size=(resamples, positions.size))] + offsets
+    return np.bincount(picked.ravel(), minlength=resamples * grid_size).reshape(resamples, grid_size)
+
+
+def distance_statistics_on_grid(values: np.ndarray, counts_a: np.ndarray, counts_b: np.ndarray) -> tuple:
+    """
+    Will compute the kolmogorov smirnov and the Wasserstein distance of many weighted
+    samples at once on the grid, one resample per row.
+    The ECDF gap of every value is kept as n * m times the real gap, an integer that is
+    exact in floating point, and is shared by both distances.
+    :param values: The distinct values of the grid.
+    :param counts_a: For every resample of sample A the amount of measurements on each value.
+    :param counts_b: For every resample of sample B the amount of measurements on each value.
+    :return: The kolmogorov smirnov distances and the Wasserstein distances (not rounded).
+    """
+    size_a, size_b = int(counts_a[0].sum()), int(counts_b[0].sum())
+    gaps = np.multiply(counts_a, float(size_b))
+    gaps -= counts_b * float(size_a)
+    np.cumsum(gaps, axis=1, out=gaps)
+    np.abs(gaps, out=gaps)
+
+    greatest_common_divisor = math.gcd(size_a, size_b)
+    kolmogorov_smirnov_distances = (np.max(gaps, axis=1) // greatest_common_divisor) / \
+        ((size_a // greatest_common_divisor) * size_b)
+    wasserstein_distances = (gaps[:, :-1] @ np.diff(values)) / (float(size_a) * size_b)
+    return kolmogorov_smirnov_distances, wasserstein_distances
+
+
+def _bootstrap_batch(task: tuple) -> tuple:
+    """
+    Will compute the distances of one batch of resamples on the grid of the worker.
+    :param task: The seed sequence of the batch and the amount of resamples.
+    :return: The kolmogorov smirnov distances and the Wasserstein distances of the batch.
+    """
+    seed_sequence, resamples = task
+    values, positions_a, positions_b = _WORKER_GRID
+    generator = np.random.default_rng(seed_sequence)
+    return distance_statistics_on_grid(
+        values,
+        _resample_onto_grid(generator, positions_a, values.size, resamples),
+        _resample_onto_grid(generator, positions_b, values.size, resamples)
+    )
+
+
+def bootstrap_distance_statistics(sample_a: np.ndarray, sample_b: np.ndarray, resamples: int = 1000,
+                                  seed: int = 1996, processes: int = None) -> tuple:
+    """
+    Will bootstrap the kolmogorov smirnov and the Wasserstein distance of two sorted samples.
+    Both samples are resampled with replacement, the resamples are handled in batches of 2D
+    array operations on the merged grid of the (already sorted) samples and the batches are
+    spread over a process pool. Samples with many ties draw the count of every distinct value
+    from a multinomial distribution instead of drawing every measurement.
+    Every batch has its own seed derived from the seed, so the outcome does not depend on
+    the amount of processes.
+    :param sample_a: The sorted A population (baseline).
+    :param sample_b: The sorted B population (benchmark).
+    :param resamples: The amount of bootstrap resamples.
+    :param seed: The seed of the resampling.
+    :param processes: The amount of worker processes, by default one per core.
+    1 computes everything in the current process.
+    :return: The kolmogorov smirnov distances and the Wasserstein distances of every resample (not rounded).
+    """
+    grid = merge_into_grid(sample_a, sample_b)
+    grid_size = grid[0].size
+    cells = max([grid_size] + [len(sample) for sample in (sample_a, sample_b)
+                               if not _draws_multinomial(len(sample), grid_size)])
+    batch_size = max(BATCH_CELLS // cells, 1)
+    batches = [min(batch_size, resamples - start) for start in range(0, resamples, batch_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(batches))
+    tasks = list(zip(seed_sequences, batches))
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) < 2:
+        _initialize_worker(grid)
+        results = [_bootstrap_batch(task) for task in tasks]
+        _initialize_worker(None)
+    else:
+        with ProcessPoolExecutor(min(processes, len(tasks)), initializer=_initialize_worker,
+                                 initargs=(grid,)) as executor:
+            results = list(executor.map(_bootstrap_batch, tasks))
+
+    if not results:
+        return np.empty(0), np.empty(0)
+    kolmogorov_smirnov_distances, wasserstein_distances = zip(*results)
+    return np.concatenate(kolmogorov_smirnov_distances), np.concatenate(wasserstein_distances)
+
+
+def confidence_interval(values: np.ndarray, confidence_level: float = 0.95) -> tuple:
+    """
+    Will give back the percentile interval of bootstrapped values.
+    :param values: The bootstrapped values.
+    :param confidence_level: The confidence level between 0 and 1.
+    :return: The lower and upper bound of the interval.
+    """
+    tail = (1 - confidence_level) / 2 * 100
+    lower, upper = np.percentile(values, [tail, 100 - tail])
+    return float(lower), float(upper)
+
+
+def _wilson_interval(successes: int, trials: int, z: float) -> tuple:
+    """
+    Will give back the Wilson score interval of a proportion.
+    :param successes: The amount of successes.
+    :param trials: The amount of trials.
+    :param z: The z-score of the confidence level.
+    :return: The lower and upper bound of the proportion.
+    """
+    proportion = successes / trials
+    denominator = 1 + z ** 2 / trials
+    center = (proportion + z ** 2 / (2 * trials)) / denominator
+    margin = z * math.sqrt(proportion * (1 - proportion) / trials + z ** 2 / (4 * trials ** 2)) / denominator
+    return center - margin, center + margin
+
+
+def permutation_kolmogorov_smirnov_probability(sample_a: np.ndarray, sample_b: np.ndarray, alpha: float = 0.05,
+                                               max_permutations: int = 10000, seed: int = 1996,
+                                               confidence_level: float = 0.99) -> tuple:
+    """
+    Will compute the kolmogorov smirnov p-value with a permutation test, which makes no
+    assumptions about the distribution and so stays valid with many ties.
+    The baseline and benchmark labels of the pooled (sorted) measurements are shuffled in
+    batches, the distance of every shuffle is computed from the cumulative label counts.
+    After every batch the Wilson interval of the p-value is checked, once it is clearly above
+    or below alpha no more permutations are needed.
+    :param sample_a: The sorted A population (baseline).
+    :param sample_b: The sorted B population (benchmark).
+    :param alpha: The significance level the p-value is compared with to stop early.
+    :param max_permutations: The maximum amount of permutations.
+    :param seed: The seed of the permutations.
+    :param confidence_level: The confidence level of the Wilson interval used to stop early.
+    :return: The p-value and the amount of permutations it is based on.
+    """
+    size_a, size_b = len(sample_a), len(sample_b)
+    values, counts_a, counts_b = merge_sorted_samples(sample_a, sample_b)
+    last_of_tie = np.flatnonzero(np.append(values[1:] != values[:-1], True))
+
+    # The gaps are compared as integers, n * m times the real distance.
+    observed = np.max(np.abs(counts_a[last_of_tie] * size_b - counts_b[last_of_tie] * size_a))
+    sizes = last_of_tie + 1
+
+    labels = np.zeros(size_a + size_b, dtype=np.int32)
+    labels[:size_a] = 1
+    batch_size = int(np.clip(BATCH_CELLS // labels.size, 1, 1000))
+    generator = np.random.default_rng(seed)
+    z = float(stats.norm.ppf(1 - (1 - confidence_level) / 2))
+
+    permutations, exceeded = 0, 0
+    while permutations < max_permutations:
+        batch = min(batch_size, max_permutations - permutations)
+        shuffled = generator.permuted(np.broadcast_to(labels, (batch, labels.size)), axis=1)
+        shuffled_counts_a = np.cumsum(shuffled, axis=1, dtype=np.int64)[:, last_of_tie]
+        gaps = np.abs(shuffled_counts_a * (size_a + size_b) - sizes * size_a)
+        exceeded += int(np.count_nonzero(np.max(gaps, axis=1) >= observed))
+        permutations += batch
+
+        lower, upper = _wilson_interval(exceeded, permutations, z)
+        if upper < alpha or lower > alpha:
+            break
+
+    return (exceeded + 1) / (permutations + 1), permutations
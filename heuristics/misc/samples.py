@@ -0,0 +1,163 @@
+# coding=utf-8
+from heuristics.misc.helpers import calculate_ecdf, calculate_percentiles
+import numpy as np
+import pandas as pd
+
+
+class SortedSample:
+    """
+    An immutable, array backed sample that is sorted once when it is constructed.
+    Everything a heuristic needs from a run (percentiles, the normalization cut-off,
+    the normalized sample, the ECDF and the summary statistics) is derived from the
+    sorted values and cached, so a comparison never sorts the same data twice.
+    All heuristics in this package accept a sorted sample instead of raw data.
+    """
+
+    def __init__(self, data, perc: float = 95, presorted: bool = False) -> None:
+        """
+        Will copy and sort the data.
+        :param data: the raw data, a list or a (memory-mapped) NumPy array.
+        :param perc: The percentile cut-off point used to normalize the data.
+        :param presorted: True when the data is already sorted in ascending order.
+        """
+        values = np.array(data, dtype=np.float64)
+        if not presorted:
+            values.sort()
+        values.flags.writeable = False
+        self.__dict__["_values"] = values
+        self.__dict__["_percentile"] = perc
+
+    def __setattr__(self, key, value) -> None:
+        raise AttributeError("A SortedSample is immutable.")
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        The measurements in ascending order.
+        :return: A read-only NumPy array.
+        """
+        return self._values
+
+    @property
+    def count(self) -> int:
+        """
+        Will count how many measurements there are in the sample.
+        :return: Will return an integer representing the count.
+        """
+        return int(self._values.size)
+
+    @property
+    def sum(self) -> float:
+        """
+        This total amount of all of the measurement combined.
+        :return: returns a float representing the total sum.
+        """
+        if "_sum_" not in self.__dict__.keys():
+            self.__dict__["_sum_"] = float(np.sum(self._values))
+        return self.__dict__["_sum_"]
+
+    @property
+    def mean(self) -> float:
+        """
+        The (unrounded) average of the sample.
+        :return: a float that represents the average of the sample
+        """
+        if "_mean_" not in self.__dict__.keys():
+            self.__dict__["_mean_"] = float(np.mean(self._values))
+        return self.__dict__["_mean_"]
+
+    @property
+    def variance(self) -> float:
+        """
+        The population variance of the sample.
+        :return: A float which is the variance.
+        """
+        if "_variance_" not in self.__dict__.keys():
+            self.__dict__["_variance_"] = float(np.var(self._values))
+        return self.__dict__["_variance_"]
+
+    @property
+    def standard_deviation(self) -> float:
+        """
+        The population standard deviation of the sample.
+        :return: A float which is the standard deviation.
+        """
+        return float(np.sqrt(self.variance))
+
+    @property
+    def min(self) -> float:
+        """
+        The smallest measurement, the first of the sorted values.
+        Will raise a ValueError when the sample is empty.
+        :return: A float that is the minimum number.
+        """
+        if self.count == 0:
+            raise ValueError("The minimum of an empty sample is undefined.")
+        return float(self._values[0])
+
+    @property
+    def max(self) -> float:
+        """
+        The largest measurement, the last of the sorted values.
+        Will raise a ValueError when the sample is empty.
+        :return: A float that is the maximum number.
+        """
+        if self.count == 0:
+            raise ValueError("The maximum of an empty sample is undefined.")
+        return float(self._values[-1])
+
+    @property
+    def median(self) -> float:
+        """
+        The median of the sample.
+        :return: A float which is the median.
+        """
+        return self.percentile(50)
+
+    def percentiles(self, percentiles) -> np.ndarray:
+        """
+        Will calculate a vector of percentiles from the sorted values without sorting them again.
+        :param percentiles: The percentiles between 0 and 100.
+        :return: An array containing the calculated percentiles.
+        """
+        return calculate_percentiles(self._values, percentiles, presorted=True)
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Will calculate a single percentile from the sorted values.
+        :param percentile: The percentile between 0 and 100.
+        :return: The requested percentile as a float.
+        """
+        return float(self.percentiles([percentile])[0])
+
+    @property
+    def normalization_cutoff(self) -> float:
+        """
+        The percentile from which measurements are excluded from normalization.
+        :return: A float which is the cut-off point.
+        """
+        if "_normalization_cutoff_" not in self.__dict__.keys():
+            self.__dict__["_normalization_cutoff_"] = self.percentile(self._percentile)
+        return self.__dict__["_normalization_cutoff_"]
+
+    @property
+    def normalized(self) -> np.ndarray:
+        """
+        The normalized sample, as the values are sorted this is a view on the
+        values up to the normalization cut-off.
+        :return: A sorted read-only NumPy array.
+        """
+        return self._values[:np.searchsorted(self._values, self.normalization_cutoff, side="right")]
+
+    @property
+    def ecdf(self) -> pd.DataFrame:
+        """
+        The ECDF (empirical cumulative distribution function) of the normalized sample.
+        :return: a data frame containing the ECDF
+        """
+        if "_ecdf_" not in self.__dict__.keys():
+            self.__dict__["_ecdf_"] = calculate_ecdf(self.normalized, presorted=True)
+        return self.__dict__["_ecdf_"]
@@ -0,0 +1,118 @@
+# coding=utf-8
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
+from operator import sub
+import numpy as np
+
+# The compiled form of the scoring matrix, boundaries are in ascending order.
+ScoringMatrix = namedtuple(
+    "ScoringMatrix",
+    ["wasserstein_boundaries", "kolmogorov_smirnov_boundaries", "punishments", "remaining_scores"]
+)
+
+# The compiled form of the letter ranks in the order they are checked.
+LetterRanks = namedtuple("LetterRanks", ["wasserstein_boundaries", "kolmogorov_smirnov_boundaries", "ranks"])
+
+DIRICHLET_SEED = 1996
+
+
+@lru_cache(maxsize=None)
+def _compile_scoring_matrix(wasserstein_lowest_boundary: float, kolmogorov_smirnov_lowest_boundary: float,
+                            matrix_size: int, boundary_increment: float, seed: int) -> ScoringMatrix:
+    """
+    Will build the scoring matrix once per configuration.
+    The dirichlet punishments are drawn from a private random state, so the global
+    NumPy random number generator is never reseeded.
+    """
+    dirichlet_distribution = np.random.RandomState(seed).dirichlet(alpha=np.ones(matrix_size), size=1)[0]
+    punishments = np.sort(dirichlet_distribution)[::-1]
+
+    # The boundaries are accumulated the same way as adding the increment step by step.
+    increments = np.full(matrix_size, boundary_increment, dtype=np.float64)
+    increments[0] = wasserstein_lowest_boundary
+    wasserstein_boundaries = np.add.accumulate(increments)
+    increments[0] = kolmogorov_smirnov_lowest_boundary
+    kolmogorov_smirnov_boundaries = np.add.accumulate(increments)
+
+    # remaining_scores[i] is the score left after the first i punishments have been subtracted.
+    remaining_scores = np.array(list(accumulate(punishments.tolist(), sub, initial=1.0)))
+    for array in (wasserstein_boundaries, kolmogorov_smirnov_boundaries, punishments, remaining_scores):
+        array.flags.writeable = False
+    return ScoringMatrix(wasserstein_boundaries, kolmogorov_smirnov_boundaries, punishments, remaining_scores)
+
+
+def compile_scoring_matrix(heuristics_boundaries: dict, seed: int = DIRICHLET_SEED) -> ScoringMatrix:
+    """
+    Will give back the (cached) scoring matrix of a set of heuristics boundaries.
+    Boundaries grow with a positive increment, so the breached boundaries are always
+    the first part of the matrix and the score is a simple lookup.
+    :param heuristics_boundaries: a set of boundaries that determine the outcome of the heuristic.
+    :param seed: The seed of the dirichlet distribution.
+    :return: The compiled scoring matrix.
+    """
+    score_boundaries = heuristics_boundaries["score_boundaries"]
+    return _compile_scoring_matrix(
+        float(score_boundaries["wasserstein_lowest_boundary"]),
+        float(score_boundaries["kolmogorov_smirnov_lowest_boundary"]),
+        int(score_boundaries["matrix_size"]),
+        float(score_boundaries["boundary_increment"]),
+        seed
+    )
+
+
+@lru_cache(maxsize=None)
+def _compile_letter_ranks(letter_ranks: tuple) -> LetterRanks:
+    """
+    Will build the letter rank arrays once per configuration.
+    """
+    wasserstein_boundaries, kolmogorov_smirnov_boundaries, ranks = (np.array(column) for column in zip(*letter_ranks))
+    return LetterRanks(wasserstein_boundaries.astype(np.float64), kolmogorov_smirnov_boundaries.astype(np.float64),
+                       np.append(ranks, "F"))
+
+
+def compile_letter_ranks(heuristics_boundaries: dict) -> LetterRanks:
+    """
+    Will give back the (cached) letter rank boundaries of a set of heuristics boundaries.
+    :param heuristics_boundaries: a set of boundaries that determine the outcome of the heuristic.
+    :return: The compiled letter ranks, with an F appended for when no grade fits.
+    """
+    return _compile_letter_ranks(
+        tuple(
+            (grade["wasserstein_boundary"], grade["kolmogorov_smirnov_boundary"], grade["rank"])
+            for grade in heuristics_boundaries["letter_ranks"]
+        )
+    )
+
+
+def score_distances(wasserstein_distance, kolmogorov_smirnov_distance, scoring_matrix: ScoringMatrix) -> np.ndarray:
+    """
+    Will score one or many pairs of distances from 0 to 100 with the scoring matrix.
+    :param wasserstein_distance: One or an array of rounded Wasserstein distances.
+    :param kolmogorov_smirnov_distance: One or an array of rounded kolmogorov smirnov distances.
+    :param scoring_matrix: The compiled scoring matrix.
+    :return: The unrounded score(s) from 0 - 100.
+    """
+    ws_score = scoring_matrix.remaining_scores[
+        np.searchsorted(scoring_matrix.wasserstein_boundaries, wasserstein_distance, side="right")
+    ]
+    ks_score = scoring_matrix.remaining_scores[
+        np.searchsorted(scoring_matrix.kolmogorov_smirnov_boundaries, kolmogorov_smirnov_distance, side="right")
+    ]
+    return np.abs((ks_score + ws_score) / 2 * 100)
+
+
+def letter_rank_distances(wasserstein_distance, kolmogorov_smirnov_distance, letter_ranks: LetterRanks) -> np.ndarray:
+    """
+    Will letter rank one or many pairs of distances, the first grade whose boundaries
+    are both not reached is given, F when none fits.
+    :param wasserstein_distance: One or an array of rounded Wasserstein distances.
+    :param kolmogorov_smirnov_distance: One or an array of rounded kolmogorov smirnov distances.
+    :param letter_ranks: The compiled letter ranks.
+    :return: The letter rank(s).
+    """
+    fits = (np.expand_dims(wasserstein_distance, -1) < letter_ranks.wasserstein_boundaries) & \
+           (np.expand_dims(kolmogorov_smirnov_distance, -1) < letter_ranks.kolmogorov_smirnov_boundaries)
+    # An extra column that always fits points to the trailing F.
+    fits = np.concatenate((fits, np.ones(fits.shape[:-1] + (1,), dtype=bool)), axis=-1)
+    return letter_ranks.ranks[np.argmax(fits, axis=-1)]
@@ -0,0 +1,151 @@
+# coding=utf-8
+import numpy as np
+import math
+
+
+class QuantileSketch:
+    """
+    A bounded memory quantile sketch based on the KLL algorithm
+    (Karnin, Lang & Liberty, "Optimal Quantile Approximation in Streams").
+
+    Measurements are kept in a hierarchy of compactors, each level holds items
+    that represent 2^level measurements. When a level is full it is sorted and
+    every other item is promoted to the next level, which keeps the state
+    at a few thousand floats no matter how many measurements are added.
+    Sketches of separate chunks or load injectors can be merged.
+
+    More info about quantile sketches can be found here:
+    https://arxiv.org/abs/1603.05346
+    """
+    SEED = 1996
+    CAPACITY_DECAY = 2 / 3
+    MINIMUM_CAPACITY = 2
+
+    def __init__(self, accuracy: float = 0.01, seed: int = SEED) -> None:
+        """
+        Will construct an empty sketch.
+        :param accuracy: The targeted rank error, 0.01 means that a requested percentile
+        is answered with a measurement that is within about 1 percentile of it.
+        :param seed: The seed used to pick which half of a compactor is promoted.
+        """
+        self.accuracy = accuracy
+        self.k = max(int(math.ceil(3 / accuracy)), 8)
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._levels = [np.empty(0, dtype=np.float64)]
+        self._generator = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size(self) -> int:
+        """
+        The amount of items that are retained by the sketch.
+        :return: An integer representing the retained items.
+        """
+        return sum(level.size for level in self._levels)
+
+    def _capacity(self, level: int) -> int:
+        """
+        The capacity of a compactor, the lower levels get exponentially less room.
+        :param level: The level of the compactor.
+        :return: The maximum amount of items this level may hold.
+        """
+        depth = len(self._levels) - level - 1
+        return max(int(math.ceil(self.k * self.CAPACITY_DECAY ** depth)), self.MINIMUM_CAPACITY)
+
+    def update(self, chunk) -> None:
+        """
+        Will add a chunk of measurements to the sketch.
+        :param chunk: A list or array of measurements.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64).ravel()
+        if chunk.size == 0:
+            return
+
+        self.count += int(chunk.size)
+        self.min = min(self.min, float(np.min(chunk)))
+        self.max = max(self.max, float(np.max(chunk)))
+        self._levels[0] = np.concatenate((self._levels[0], chunk))
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Will merge another sketch into this sketch.
+        :param other: The sketch of another chunk or load injector.
+        """
+        if other.count == 0:
+            return
+
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate((self._levels[level], items))
+
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _compress(self) -> None:
+        """
+        Will compact every level that exceeds its capacity by sorting it and
+        promoting the odd or even items (picked at random) to the next level.
+        """
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0, dtype=np.float64))
+
+                items = np.sort(items)
+                # An odd item stays behind so every promoted pair represents two measurements.
+                leftover = items[-1:] if items.size % 2 else items[:0]
+                paired = items[:items.size - leftover.size]
+                promoted = paired[int(self._generator.integers(0, 2))::2]
+                self._levels[level + 1] = np.concatenate((self._levels[level + 1], promoted))
+                self._levels[level] = leftover
+                # Adding a level shrinks the capacity of the lower levels, so start over.
+                level = 0
+                continue
+
+            level += 1
+
+    def quantiles(self, quantiles) -> np.ndarray:
+        """
+        Will estimate a vector of quantiles from the sketch.
+        :param quantiles: The quantiles between 0 and 1.
+        :return: An array with the estimated measurement of each quantile.
+        """
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        if self.count == 0:
+            return np.full(quantiles.shape, np.nan)
+
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(level.size, 2 ** height) for height, level in enumerate(self._levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative_weights = items[order], np.cumsum(weights[order])
+
+        positions = np.searchsorted(cumulative_weights, quantiles * cumulative_weights[-1], side="left")
+        estimates = items[np.clip(positions, 0, items.size - 1)]
+        estimates = np.where(quantiles <= 0, self.min, estimates)
+        return np.where(quantiles >= 1, self.max, estimates)
+
+    def percentiles(self, percentiles) -> np.ndarray:
+        """
+        Will estimate a vector of percentiles from the sketch.
+        :param percentiles: The percentiles between 0 and 100.
+        :return: An array with the estimated measurement of each percentile.
+        """
+        return self.quantiles(np.asarray(percentiles, dtype=np.float64) / 100)
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Will estimate a single percentile from the sketch.
+        :param percentile: The percentile between 0 and 100.
+        :return: The estimated measurement.
+        """
+        return float(self.percentiles([percentile])[0])
@@ -1,4 +1,5 @@
 # coding=utf-8
+from heuristics.misc.samples import SortedSample
 import numpy as np
 
 # Silence Divided by zero warnings
@@ -22,14 +23,48 @@ class PercentileComparison:
         """
         Will set up th class and find the max edge of the score from which the distance
         will be calculated by determining the length of the baseline sample.
+        The score is calculated once, so reading it again always gives the same outcome.
         :param benchmark_sample: A benchmark percentile distribution following
-        an exponential distribution.
+        an exponential distribution, a SortedSample is converted into its 1st to 99th percentile.
         :param baseline_sample: A baseline percentile distribution following
-        an exponential distribution.
+        an exponential distribution, a SortedSample is converted into its 1st to 99th percentile.
         """
-        self.BENCHMARK_SAMPLE = benchmark_sample
-        self.BASELINE_SAMPLE = baseline_sample
-        self._score = len(baseline_sample)
+        self.BENCHMARK_SAMPLE = self._percentile_distribution(benchmark_sample)
+        self.BASELINE_SAMPLE = self._percentile_distribution(baseline_sample)
+        self.percentage_changes = self._calculate_percentage_changes(
+            np.asarray(self.BASELINE_SAMPLE, dtype=np.float64), np.asarray(self.BENCHMARK_SAMPLE, dtype=np.float64)
+        )
+        self._score = float(self._punish(self.percentage_changes, len(self.BASELINE_SAMPLE)))
+
+    @classmethod
+    def score_many(cls, benchmark_samples, baseline_sample) -> np.ndarray:
+        """
+        Will score many benchmarks against one baseline in one go,
+        for example the percentile distribution of every transaction.
+        :param benchmark_samples: A matrix with a benchmark percentile distribution per row,
+        or a list of percentile distributions and/or SortedSamples.
+        :param baseline_sample: The baseline percentile distribution or its SortedSample.
+        :return: An array with the score of every benchmark.
+        """
+        baseline = np.asarray(cls._percentile_distribution(baseline_sample), dtype=np.float64)
+        if isinstance(benchmark_samples, np.ndarray):
+            benchmarks = benchmark_samples.astype(np.float64, copy=False)
+        else:
+            benchmarks = np.array([cls._percentile_distribution(sample) for sample in benchmark_samples],
+                                  dtype=np.float64).reshape(-1, baseline.size)
+        changes = cls._calculate_percentage_changes(baseline, benchmarks)
+        return cls._distance_score(cls._punish(changes, baseline.size), baseline.size)
+
+    @staticmethod
+    def _percentile_distribution(sample) -> list:
+        """
+        Will give back the percentile distribution of a sample.
+        :param sample: A percentile distribution or a SortedSample.
+        :return: The percentile distribution.
+        """
+        if isinstance(sample, SortedSample):
+            return sample.percentiles(range(1, 100)).tolist()
+        return sample
 
     @property
     def score(self) -> float:
@@ -40,50 +75,57 @@ class PercentileComparison:
         """
         return self._calculate_percentile_distance_score()
 
-    def _push_value_through_positive_change_matrix(self, value: float) -> None:
+    @staticmethod
+    def _calculate_percentage_changes(baseline: np.ndarray, benchmarks: np.ndarray) -> np.ndarray:
         """
-        Will iterate a value trough the positive change grid and will
-        punish the score when a threshold is broken.
-        :param value: The percentage difference between the benchmark and the baseline.
+        Will calculate the percentage difference of every percentile, rounded to 2 decimals.
+        A change that can not be calculated (a baseline of zero) counts as no change.
+        When the distributions differ in length only the shared percentiles are compared.
+        :param baseline: The baseline percentile distribution.
+        :param benchmarks: One or a matrix of benchmark percentile distributions.
+        :return: The percentage changes, the same shape as the benchmarks.
         """
-        for punishment, threshold in zip(self.GRID["positive_punishment"], self.GRID["positive_threshold"]):
-            if value > threshold:
-                self._score -= punishment
-            else:
-                continue
+        size = min(baseline.shape[-1], benchmarks.shape[-1])
+        baseline, benchmarks = baseline[..., :size], benchmarks[..., :size]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            changes = (benchmarks - baseline) / baseline * 100
+        return np.round(np.where(np.isfinite(changes), changes, 0.0), 2)
 
-    def _push_value_through_negative_change_matrix(self, value: float) -> None:
+    @classmethod
+    def _punish(cls, changes: np.ndarray, score: float) -> np.ndarray:
         """
-        Will iterate a value trough the negative change grid and will
-        punish the score when a threshold is broken.
-        :param value: The percentage difference between the benchmark and the baseline.
+        Will push every percentage change through the change grid and subtract the punishment
+        of every threshold it breaks from the score.
+        Positive changes are checked against the positive thresholds and negative changes
+        against the negative thresholds. The punishments are subtracted one after another in
+        the same order as walking through the grid, percentile by percentile.
+        :param changes: One or a matrix of percentage changes, percentiles on the last axis.
+        :param score: The score before any punishment.
+        :return: The remaining score(s).
         """
-        for punishment, threshold in zip(self.GRID["negative_punishment"], self.GRID["negative_threshold"]):
-            if value < threshold:
-                self._score -= punishment
-            else:
-                continue
+        changes = changes[..., np.newaxis]
+        punishments = np.where(
+            (changes > 0) & (changes > np.asarray(cls.GRID["positive_threshold"], dtype=np.float64)),
+            np.asarray(cls.GRID["positive_punishment"], dtype=np.float64),
+            0.0
+        ) + np.where(
+            (changes < 0) & (changes < np.asarray(cls.GRID["negative_threshold"], dtype=np.float64)),
+            np.asarray(cls.GRID["negative_punishment"], dtype=np.float64),
+            0.0
+        )
+        punishments = punishments.reshape(punishments.shape[:-2] + (-1,))
+        scores = np.full(punishments.shape[:-1] + (1,), score, dtype=np.float64)
+        return np.subtract.accumulate(np.concatenate((scores, punishments), axis=-1), axis=-1)[..., -1]
 
-    def _iterate_through_percentiles_and_calculate_difference(self) -> None:
+    @staticmethod
+    def _distance_score(score, size: int):
         """
-        Will go through each percentile measurement and calculate the percentage
-        difference between them which it will push through its respectable
-        change matrix.
+        Will turn the remaining score into a score from 0 to 100.
+        :param score: The remaining score(s).
+        :param size: The amount of baseline percentiles.
+        :return: The distance score(s).
         """
-        for baseline_value, benchmark_value in zip(self.BASELINE_SAMPLE, self.BENCHMARK_SAMPLE):
-
-            # Calculate percentage change
-            change = round(calculate_percentage_change(old=baseline_value, new=benchmark_value), 2)
-
-            # Score the amount of distance
-            if change > 0:
-                self._push_value_through_positive_change_matrix(value=change)
-
-            elif change < 0:
-                self._push_value_through_negative_change_matrix(value=change)
-
-            else:
-                continue
+        return np.abs(np.round(np.asarray(score, dtype=np.float64) / float(size) * 100, 2))
 
     def _calculate_percentile_distance_score(self) -> float:
         """
@@ -91,5 +133,4 @@ class PercentileComparison:
         measurements exhausted its threshold.
         :return: The distance score
         """
-        self._iterate_through_percentiles_and_calculate_difference()
-        return abs(round(float(self._score) / float(len(self.BASELINE_SAMPLE)) * 100, 2))
\ No newline at end of file
+        return float(self._distance_score(self._score, len(self.BASELINE_SAMPLE)))
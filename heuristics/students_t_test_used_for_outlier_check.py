@@ -1,33 +1,148 @@
 # coding=utf-8
+from heuristics.misc.measurements import StreamingMeasurements
+from heuristics.misc.samples import SortedSample
+from collections import namedtuple
+from functools import lru_cache
 import numpy as np
-from decimal import Decimal
 from scipy import stats
 
 # Silence Divided by zero warnings
 np.seterr(divide='ignore')
 
+# The outcome of many t-tests at once, every field is an array with a value per pair.
+TTestResults = namedtuple("TTestResults", ["t_values", "critical_t_values", "results"])
+
+
+@lru_cache(maxsize=None)
+def _critical_t_value(degrees_of_freedom: int) -> float:
+    """
+    Will calculate (once per degrees of freedom) the two-sided critical t-value at a 5% significance level.
+    :param degrees_of_freedom: The degrees of freedom.
+    :return: The critical t-value
+    """
+    return float(stats.t.ppf(q=1-.05/2, df=degrees_of_freedom))
+
 
 class TTest:
 
     def __init__(self, baseline_measurements: list, benchmark_measurements: list) -> None:
+        """
+        Will summarize both samples and run the t-test once.
+        :param baseline_measurements: A list of measurements, a SortedSample or a StreamingMeasurements object.
+        :param benchmark_measurements: A list of measurements, a SortedSample or a StreamingMeasurements object.
+        """
         super(TTest, self).__init__()
 
         # Baseline calculations
-        self.baseline_measurements = np.array(baseline_measurements)
-        self.baseline_mean = np.mean(self.baseline_measurements)
-        self.baseline_variance = np.var(self.baseline_measurements)
-        self.baseline_number_of_samples = self.baseline_measurements.size
+        self.baseline_measurements, self.baseline_mean, self.baseline_variance, \
+            self.baseline_number_of_samples = self._summarize(baseline_measurements)
 
         # Benchmark calculations
-        self.benchmark_measurements = np.array(benchmark_measurements)
-        self.benchmark_mean = np.mean(self.benchmark_measurements)
-        self.benchmark_variance = np.var(self.benchmark_measurements)
-        self.benchmark_number_of_samples = self.benchmark_measurements.size
+        self.benchmark_measurements, self.benchmark_mean, self.benchmark_variance, \
+            self.benchmark_number_of_samples = self._summarize(benchmark_measurements)
+
+        self._compute()
+
+    @classmethod
+    def from_summary(cls, baseline_mean: float, baseline_variance: float, baseline_number_of_samples: int,
+                     benchmark_mean: float, benchmark_variance: float, benchmark_number_of_samples: int) -> "TTest":
+        """
+        Will run the t-test on the summary statistics of both runs, the raw measurements are not needed.
+        :param baseline_mean: The mean of the baseline.
+        :param baseline_variance: The population variance of the baseline.
+        :param baseline_number_of_samples: The amount of baseline measurements.
+        :param benchmark_mean: The mean of the benchmark.
+        :param benchmark_variance: The population variance of the benchmark.
+        :param benchmark_number_of_samples: The amount of benchmark measurements.
+        :return: The t-test, its measurements are None.
+        """
+        t_test = cls.__new__(cls)
+        t_test.baseline_measurements, t_test.benchmark_measurements = None, None
+        t_test.baseline_mean, t_test.baseline_variance = float(baseline_mean), float(baseline_variance)
+        t_test.baseline_number_of_samples = int(baseline_number_of_samples)
+        t_test.benchmark_mean, t_test.benchmark_variance = float(benchmark_mean), float(benchmark_variance)
+        t_test.benchmark_number_of_samples = int(benchmark_number_of_samples)
+        t_test._compute()
+        return t_test
+
+    @classmethod
+    def batch(cls, baseline_means, baseline_variances, baseline_numbers_of_samples,
+              benchmark_means, benchmark_variances, benchmark_numbers_of_samples) -> TTestResults:
+        """
+        Will run the t-test for many pairs of summaries at once, for example one pair per transaction.
+        Like a single t-test a pair without any noise but with a signal gets an infinite t-value and fails the test.
+        :param baseline_means: The means of the baselines.
+        :param baseline_variances: The population variances of the baselines.
+        :param baseline_numbers_of_samples: The amounts of baseline measurements.
+        :param benchmark_means: The means of the benchmarks.
+        :param benchmark_variances: The population variances of the benchmarks.
+        :param benchmark_numbers_of_samples: The amounts of benchmark measurements.
+        :return: The t-values, the critical t-values and the results of every pair.
+        """
+        baseline_means, benchmark_means = np.asarray(baseline_means, dtype=np.float64), \
+            np.asarray(benchmark_means, dtype=np.float64)
+        baseline_numbers_of_samples = np.asarray(baseline_numbers_of_samples, dtype=np.int64)
+        t_values = cls._calculate_t_values(
+            baseline_means, np.asarray(baseline_variances, dtype=np.float64), baseline_numbers_of_samples,
+            benchmark_means, np.asarray(benchmark_variances, dtype=np.float64),
+            np.asarray(benchmark_numbers_of_samples, dtype=np.int64)
+        )
+
+        # The critical value only depends on the degrees of freedom, so it is computed once per size.
+        sizes, positions = np.unique(baseline_numbers_of_samples, return_inverse=True)
+        critical_t_values = np.array([_critical_t_value(int(size) - 2) for size in sizes])[positions.reshape(-1)]
+        critical_t_values = critical_t_values.reshape(t_values.shape)
+        return TTestResults(t_values, critical_t_values, ~(t_values > critical_t_values))
+
+    @staticmethod
+    def _summarize(measurements) -> tuple:
+        """
+        Will give back the measurements with their mean, variance and size.
+        The cached statistics of a SortedSample and the running statistics of
+        a StreamingMeasurements object are reused.
+        :param measurements: A list of measurements, a SortedSample or a StreamingMeasurements object.
+        :return: The measurements as an array (None when streamed), the mean, the variance and the number of samples.
+        """
+        if isinstance(measurements, SortedSample):
+            return measurements.values, measurements.mean, measurements.variance, measurements.count
+
+        if isinstance(measurements, StreamingMeasurements):
+            return None, measurements.mean, measurements.variance, measurements.count
+
+        measurements = np.array(measurements)
+        return measurements, float(np.mean(measurements)), float(np.var(measurements)), measurements.size
+
+    @staticmethod
+    def _calculate_t_values(baseline_means, baseline_variances, baseline_numbers_of_samples,
+                            benchmark_means, benchmark_variances, benchmark_numbers_of_samples) -> np.ndarray:
+        """
+        Will calculate one or many absolute t-values (Welch) out of the summary statistics.
+        When both means are zero or there is no signal the t-value is 0.
+        :return: The t-value(s), infinite when there is a signal without noise.
+        """
+        signal = np.subtract(benchmark_means, baseline_means, dtype=np.float64)
+        noise = np.sqrt(np.divide(baseline_variances, baseline_numbers_of_samples, dtype=np.float64) +
+                        np.divide(benchmark_variances, benchmark_numbers_of_samples, dtype=np.float64))
+        no_change = (signal == 0) | ((np.asarray(baseline_means) == 0) & (np.asarray(benchmark_means) == 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(no_change, 0.0, np.abs(signal / np.where(no_change, 1, noise)))
+
+    def _compute(self) -> None:
+        """
+        Will compute the t-value, the critical t-value and the outcome of the test once.
+        When neither sample varies but their means differ the t-value is infinite, the largest
+        possible difference, so the test fails.
+        """
+        self._t_value = float(self._calculate_t_values(
+            self.baseline_mean, self.baseline_variance, self.baseline_number_of_samples,
+            self.benchmark_mean, self.benchmark_variance, self.benchmark_number_of_samples
+        ))
+        self._critical_t_value = _critical_t_value(self.baseline_number_of_samples - 2)
 
         # Information for test evidence report
         self.status = self._run_t_test()
-        self.value = float(self.t_value)
-        self.critical_value = float(self.critical_t_value)
+        self.value = self.t_value
+        self.critical_value = self.critical_t_value
 
     @property
     def results(self) -> bool:
@@ -42,44 +157,19 @@ class TTest:
     @property
     def t_value(self) -> float:
         """
-        Will calculate the t-value.
+        The absolute t-value, 0 when both samples have a mean of zero and
+        infinite when both samples have no variance but a different mean.
         :return: The calculate t-value
         """
-        if self._verify_both_arrays_for_zeros() is False:
-            # both arrays contain zero's, calculation not possible.
-            return 0
-
-        signal = Decimal(self.benchmark_mean - self.baseline_mean)
-        noise = Decimal((self.baseline_variance / self.baseline_number_of_samples) +
-                        (self.benchmark_variance / self.benchmark_number_of_samples)).sqrt()
-
-        if abs(signal / noise) == float("inf"):
-            raise NotImplementedError
-
-        else:
-            return abs(float(signal / noise))
+        return self._t_value
 
     @property
     def critical_t_value(self) -> float:
         """
-        Will calculate the critical t-value.
+        The critical t-value.
         :return: The critical t-value
         """
-        return stats.t.ppf(q=1-.05/2, df=self.baseline_number_of_samples-2)
-
-    def _verify_both_arrays_for_zeros(self) -> bool:
-        """
-        Will check if both arrays equal zero or not/
-        :return: True: There is no change both sums are equal to each other or -
-        False: There is change valid input for T-test.
-        """
-        if sum(self.baseline_measurements) == 0 and sum(self.benchmark_measurements) == 0:
-            # There is no change both sums are equal to each other.
-            return False
-
-        else:
-            # There is change valid input for T-test.
-            return True
+        return self._critical_t_value
 
     def _run_t_test(self) -> bool:
         """
@@ -0,0 +1,171 @@
+# coding=utf-8
+from heuristics.kolmogorov_smirnov_and_wasserstein import StatisticalDistance
+from heuristics.kullback_leibler_divergence_testing import DivergenceTest
+from heuristics.students_t_test_used_for_outlier_check import TTest
+from heuristics.misc.samples import SortedSample
+from concurrent.futures import ProcessPoolExecutor
+from pandas import DataFrame
+import pandas as pd
+import numpy as np
+import os
+
+
+def _compare_transaction(task: tuple) -> dict:
+    """
+    Will run every heuristic on the baseline and benchmark measurements of one transaction.
+    :param task: The transaction name, its baseline and benchmark response times,
+    the heuristics boundaries and the normalization percentile.
+    :return: One row of the comparison table.
+    """
+    transaction, baseline, benchmark, heuristics_boundaries, perc = task
+    baseline, benchmark = SortedSample(baseline, perc=perc), SortedSample(benchmark, perc=perc)
+    distance = StatisticalDistance(baseline, benchmark, heuristics_boundaries)
+    divergence = DivergenceTest(baseline, benchmark)
+    t_test = TTest(baseline, benchmark)
+    return {
+        "transaction": transaction,
+        "baseline_count": baseline.count,
+        "benchmark_count": benchmark.count,
+        "kolmogorov_smirnov_distance": distance.kolmogorov_smirnov_distance,
+        "kolmogorov_smirnov_probability": distance.kolmogorov_smirnov_probability,
+        "wasserstein_distance": distance.wasserstein_distance,
+        "distance_score": distance.score,
+        "distance_rank": distance.letter_rank,
+        "divergence": divergence.d_value,
+        "divergence_score": divergence.score,
+        "divergence_rank": divergence.rank,
+        "t_value": t_test.value,
+        "critical_t_value": t_test.critical_value,
+        "t_test_passed": t_test.results
+    }
+
+
+class TransactionComparison:
+    """
+    Will compare a baseline and a benchmark run per transaction instead of as one blob,
+    so a single slow transaction can no longer hide in the aggregate.
+    The transaction names are dictionary encoded, a columnar data set keeps its own encoding,
+    and both runs are grouped per transaction in one pass, after which the StatisticalDistance, DivergenceTest
+    and TTest heuristics are run for every transaction in a process pool.
+    The outcome is one table with a row per transaction.
+    """
+    COLUMNS = [
+        "transaction", "baseline_count", "benchmark_count",
+        "kolmogorov_smirnov_distance", "kolmogorov_smirnov_probability", "wasserstein_distance",
+        "distance_score", "distance_rank", "divergence", "divergence_score", "divergence_rank",
+        "t_value", "critical_t_value", "t_test_passed"
+    ]
+
+    def __init__(self, runs, baseline_id, benchmark_id, heuristics_boundaries: dict, perc: float = 95,
+                 minimum_sample_size: int = 3, processes: int = None) -> None:
+        """
+        Will group both runs per transaction and compare every transaction.
+        :param runs: The runs by RunID, for example ConvertCsvResultsIntoArrays or its .data dictionary.
+        :param baseline_id: The RunID of the baseline.
+        :param benchmark_id: The RunID of the benchmark.
+        :param heuristics_boundaries: a set of boundaries that determine the outcome of the heuristic -
+        interpretation of the distance comparison.
+        :param perc: The percentile cut-off point used to normalize the measurements.
+        :param minimum_sample_size: Transactions with less measurements in either run are not compared,
+        their row only contains the counts.
+        :param processes: The amount of worker processes, by default one per core.
+        1 computes everything in the current process.
+        """
+        self.baseline_id = baseline_id
+        self.benchmark_id = benchmark_id
+        self.heuristics_boundaries = heuristics_boundaries
+        self.perc = perc
+        self.minimum_sample_size = minimum_sample_size
+        self.processes = processes or os.cpu_count() or 1
+
+        if getattr(runs, "action_names", None) is not None:
+            self.transactions, baseline_codes, benchmark_codes = self._select_transactions(
+                runs.action_names, runs.column(baseline_id, "action_codes"), runs.column(benchmark_id, "action_codes")
+            )
+            baseline_times = runs.column(baseline_id, "response_times")
+            benchmark_times = runs.column(benchmark_id, "response_times")
+        else:
+            baseline, benchmark = runs[baseline_id], runs[benchmark_id]
+            self.transactions, baseline_codes, benchmark_codes = self._encode_transactions(
+                baseline["actions"], benchmark["actions"]
+            )
+            baseline_times, benchmark_times = baseline["response_times"], benchmark["response_times"]
+
+        baseline_index = self._group_transactions(baseline_times, baseline_codes, len(self.transactions))
+        benchmark_index = self._group_transactions(benchmark_times, benchmark_codes, len(self.transactions))
+        self.results = self._compare_transactions(baseline_index, benchmark_index)
+
+    @staticmethod
+    def _encode_transactions(baseline_actions, benchmark_actions) -> tuple:
+        """
+        Will dictionary encode the transaction names of both runs, missing names are coded as -1.
+        :param baseline_actions: The transaction names of the baseline.
+        :param benchmark_actions: The transaction names of the benchmark.
+        :return: The transaction names in order of appearance and the codes of both runs.
+        """
+        baseline_size = len(baseline_actions)
+        codes, transactions = pd.factorize(
+            np.concatenate((np.asarray(baseline_actions, dtype=object), np.asarray(benchmark_actions, dtype=object)))
+        )
+        return transactions.tolist(), codes[:baseline_size], codes[baseline_size:]
+
+    @staticmethod
+    def _select_transactions(action_names: np.ndarray, baseline_codes: np.ndarray, benchmark_codes: np.ndarray) -> tuple:
+        """
+        Will reuse the dictionary encoding of a columnar data set, the names are never decoded.
+        Only the transactions that occur in either run are kept, in order of appearance,
+        and the codes of both runs are renumbered to match.
+        :param action_names: The transaction names of the whole data set.
+        :param baseline_codes: The action codes of the baseline.
+        :param benchmark_codes: The action codes of the benchmark.
+        :return: The transaction names in order of appearance and the renumbered codes of both runs.
+        """
+        codes = np.concatenate((baseline_codes, benchmark_codes))
+        used, first = np.unique(codes[codes >= 0], return_index=True)
+        used = used[np.argsort(first, kind="stable")]
+        lookup = np.full(len(action_names), -1, dtype=np.int64)
+        lookup[used] = np.arange(used.size)
+        renumbered = [np.where(run_codes >= 0, lookup[run_codes], -1) for run_codes in (baseline_codes, benchmark_codes)]
+        return np.asarray(action_names)[used].tolist(), renumbered[0], renumbered[1]
+
+    @staticmethod
+    def _group_transactions(response_times, codes: np.ndarray, size: int) -> list:
+        """
+        Will group the response times of a run per transaction with a single stable sort.
+        Measurements without a transaction name (coded as -1) are left out.
+        :param response_times: The response times of the run.
+        :param codes: The transaction code of every response time.
+        :param size: The amount of transactions.
+        :return: A list with the response times of every transaction.
+        """
+        named = codes >= 0
+        response_times = np.asarray(response_times, dtype=np.float64)[named]
+        codes = codes[named]
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.cumsum(np.bincount(codes, minlength=size))[:-1]
+        return np.split(response_times[order], boundaries)
+
+    def _compare_transactions(self, baseline_index: list, benchmark_index: list) -> DataFrame:
+        """
+        Will run the heuristics for every transaction that has enough measurements in both runs.
+        :param baseline_index: The baseline response times per transaction.
+        :param benchmark_index: The benchmark response times per transaction.
+        :return: The comparison table with one row per transaction.
+        """
+        tasks, rows = [], []
+        for transaction, baseline, benchmark in zip(self.transactions, baseline_index, benchmark_index):
+            if min(baseline.size, benchmark.size) >= self.minimum_sample_size:
+                tasks.append((transaction, baseline, benchmark, self.heuristics_boundaries, self.perc))
+            else:
+                rows.append({"transaction": transaction, "baseline_count": baseline.size,
+                             "benchmark_count": benchmark.size})
+
+        if self.processes == 1 or len(tasks) < 2:
+            rows.extend(map(_compare_transaction, tasks))
+        else:
+            with ProcessPoolExecutor(self.processes) as executor:
+                rows.extend(executor.map(_compare_transaction, tasks, chunksize=max(len(tasks) // (4 * self.processes), 1)))
+
+        results = DataFrame(rows, columns=self.COLUMNS)
+        order = {transaction: position for position, transaction in enumerate(self.transactions)}
+        return results.sort_values("transaction", key=lambda column: column.map(order)).reset_index(drop=True)
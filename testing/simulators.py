@@ -1,8 +1,84 @@
 from heuristics.kolmogorov_smirnov_and_wasserstein import StatisticalDistance
-from data.wranglers import CreateFictitiousScenario, ConvertCsvResultsIntoDictionary
-from data.visuals import LineGraph, ScatterPlot
+from heuristics.misc.samples import SortedSample
+from data.wranglers import CreateFictitiousScenario, ScenarioFactory, open_results, fingerprint_file
+from data.visuals import LineGraph, ScatterPlot, ImageExporter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
 import random
 
+# The simulation of the worker process, shared once per worker instead of once per task.
+_WORKER_SIMULATION = None
+
+# The amount of scenario factories (and their buffers) a process keeps around.
+SCENARIO_FACTORY_CACHE_SIZE = 4
+
+
+@lru_cache(maxsize=SCENARIO_FACTORY_CACHE_SIZE)
+def _create_scenario_factory(data_set_location, baseline_id, benchmark_id, size, mtime) -> ScenarioFactory:
+    """
+    Will create a scenario factory, it is cached per data set, baseline, benchmark and
+    the size and modification time of the data set, so a changed data set is read again.
+    """
+    return ScenarioFactory(baseline_id, benchmark_id, data_set_location)
+
+
+def _get_scenario_factory(data_set_location, baseline_id, benchmark_id) -> ScenarioFactory:
+    """
+    Will give back the scenario factory of this process, so every process reads and
+    prepares a data set only once for as long as the data set does not change.
+    :param data_set_location: The data set that is used as a starting point.
+    :param baseline_id: The RID that need to be baseline
+    :param benchmark_id: The RID that needs the benchmark
+    :return: The cached scenario factory.
+    """
+    fingerprint = fingerprint_file(data_set_location, content_hash=False)
+    return _create_scenario_factory(fingerprint["path"], baseline_id, benchmark_id,
+                                    fingerprint["size"], fingerprint["mtime"])
+
+
+def clear_scenario_factories() -> None:
+    """
+    Will drop the cached scenario factories of this process and the data sets they hold.
+    """
+    _create_scenario_factory.cache_clear()
+
+
+# The image exporter of this process, created when the first image is saved.
+_IMAGE_EXPORTER = None
+
+
+def _get_image_exporter() -> ImageExporter:
+    """
+    Will give back the image exporter of this process, so the renderer is started only once.
+    :return: The shared image exporter.
+    """
+    global _IMAGE_EXPORTER
+    if _IMAGE_EXPORTER is None:
+        _IMAGE_EXPORTER = ImageExporter()
+    return _IMAGE_EXPORTER
+
+
+def _initialize_worker(simulation) -> None:
+    """
+    Will store the simulation in the worker process.
+    :param simulation: The SimulateScenario object.
+    """
+    global _WORKER_SIMULATION
+    _WORKER_SIMULATION = simulation
+
+
+def _simulate_task(task: dict) -> dict:
+    """
+    Will run one (delta, repeat) simulation inside a worker process.
+    The images of the task are saved before it returns, so export errors reach the caller.
+    :param task: The keyword arguments of the simulation.
+    :return: The computed statistics.
+    """
+    statistics = _WORKER_SIMULATION._simulate_scenario(**task)
+    _WORKER_SIMULATION._wait_for_image_exports()
+    return statistics
+
 
 class SimulateScenario:
     """
@@ -18,7 +94,8 @@ class SimulateScenario:
 
         :param benchmark_id: The RID that needs the benchmark
         :param baseline_id:  The RID that need to be baseline
-        :param data_set_location:  The data set that is used as a starting point.
+        :param data_set_location:  The data set that is used as a starting point,
+        either a csv file or the folder of a columnar run store.
         """
         self.benchmark_scenario_id = benchmark_id
         self.baseline_scenario_id = baseline_id
@@ -28,26 +105,43 @@ class SimulateScenario:
         self.image_export_folder = "C:\\temp\\change"
         self._computed_statistics = []
 
-    def _create_scenario(self, percent_of_data_set, delta, positive) -> CreateFictitiousScenario:
+    def _create_scenario(self, percent_of_data_set, delta, positive, generator=None) -> CreateFictitiousScenario:
         """
         Will create a scenario based on the scenario information.
+        The data set is read once per process by a ScenarioFactory, the changed benchmark
+        is written into the buffer of the factory, so it is only valid until the next scenario.
         :param percent_of_data_set: The amount in percentage of the
         data set that needs to be changed.
         :param delta: The amount of change.
         :param positive: True when the change the delta needs to increase on false delta will be used
         to decrease response time.
+        :param generator: An optional numpy.random.Generator, when not given the global
+        random module is seeded with the SEED.
         :return: The scenario.
         """
-        random.seed(self.SEED)
-        return CreateFictitiousScenario(
+        if generator is None:
+            random.seed(self.SEED)
+        factory = _get_scenario_factory(self.data_set_location, self.baseline_scenario_id,
+                                        self.benchmark_scenario_id)
+        return factory.create(
             percentage=percent_of_data_set,
             delta=delta,
             positive=positive,
-            baseline_id=self.baseline_scenario_id,
-            benchmark_id=self.benchmark_scenario_id,
-            data_set_location=self.data_set_location
+            generator=generator,
+            out=factory.buffer
         )
 
+    def _create_generator(self, delta, repeat_id) -> np.random.Generator:
+        """
+        Will create an independent random generator for one (delta, repeat) task.
+        Because the generator only depends on the SEED, the delta and the repeat the
+        outcome of a sweep is the same no matter how many workers are used.
+        :param delta: The amount of change.
+        :param repeat_id: The repeat of the delta.
+        :return: The seeded generator.
+        """
+        return np.random.default_rng(np.random.SeedSequence([self.SEED, int(round(delta * 1000)), repeat_id]))
+
     def _run_distance_test_on_fictitious_scenario(self, scenario: CreateFictitiousScenario) -> StatisticalDistance:
         """
         Will compare the scenario using the distance test and returning the metrics.
@@ -55,8 +149,8 @@ class SimulateScenario:
         :return: All of the statistics that have been computed.
         """
         return StatisticalDistance(
-            baseline_ecdf=scenario.baseline_y,
-            benchmark_ecdf=scenario.benchmark_y,
+            baseline_ecdf=scenario.baseline_sample,
+            benchmark_ecdf=SortedSample(scenario.benchmark_y),
             heuristics_boundaries=self.heuristics_boundaries
         )
 
@@ -97,9 +191,12 @@ class SimulateScenario:
             positive,
             image_type="line",
             save_image=False,
-            show_image=False) -> None:
+            show_image=False,
+            seeded=False,
+            record=True) -> dict:
         """
         Will run a simulation.
+        A graph is only built when it is saved or shown, saved images are queued on the image exporter.
         :param percent_of_data_set: The amount in percentage of the
         data set that needs to be changed.
         :param delta: The amount of change.
@@ -109,11 +206,15 @@ class SimulateScenario:
         :param show_image: If you want to view the image in your browser
         :param positive: True when the change the delta needs to increase on false delta will be used
         to decrease response time.
+        :param seeded: When True the scenario gets its own generator seeded from (SEED, delta, c_id).
+        :param record: When True the statistics are stored in this object and logged to the terminal.
+        :return: The computed statistics.
         """
         scenario = self._create_scenario(
             percent_of_data_set=percent_of_data_set,
             delta=delta,
-            positive=positive
+            positive=positive,
+            generator=self._create_generator(delta, c_id) if seeded else None
         )
         statistical_distance_test = self._run_distance_test_on_fictitious_scenario(scenario)
         statistics = {
@@ -126,26 +227,42 @@ class SimulateScenario:
             "rank": statistical_distance_test.letter_rank,
             "sample_size": len(scenario.baseline_y),
         }
-        self._computed_statistics.append(statistics)
-        print(statistics)  # <-- Log to the terminal
-
-        ecdf_line_graph = self._generate_line_graph(statistical_distance_test, delta)
-        raw_scatter_plot = self._generate_scatter_plot(scenario, statistical_distance_test, delta)
+        if record:
+            self._record_statistics(statistics)
 
-        if save_image and image_type == "line":
-            ecdf_line_graph.save_frame(self.image_export_folder, filename=f"{delta}")
+        if save_image or show_image:
+            if image_type == "line":
+                graph = self._generate_line_graph(statistical_distance_test, delta)
+            elif image_type == "scatter":
+                graph = self._generate_scatter_plot(scenario, statistical_distance_test, delta)
+            else:
+                return statistics
 
-        elif save_image and image_type == "scatter":
-            raw_scatter_plot.save_frame(self.image_export_folder, filename=f"{delta}")
+            if save_image:
+                # The changed benchmark lives in a reused buffer, the scatter plot needs its own copy.
+                if image_type == "scatter":
+                    scenario.benchmark_y = scenario.benchmark_y.copy()
+                _get_image_exporter().save_frame(graph, self.image_export_folder, filename=f"{delta}")
+            else:
+                graph.show()
 
-        elif show_image and image_type == "line":
-            ecdf_line_graph.show()
+        return statistics
 
-        elif show_image and image_type == "scatter":
-            raw_scatter_plot.show()
+    @staticmethod
+    def _wait_for_image_exports() -> None:
+        """
+        Will wait until every image this process queued for export has been saved.
+        """
+        if _IMAGE_EXPORTER is not None:
+            _IMAGE_EXPORTER.wait()
 
-        else:
-            del ecdf_line_graph
+    def _record_statistics(self, statistics: dict) -> None:
+        """
+        Will store the statistics of a simulation and log them to the terminal.
+        :param statistics: The computed statistics.
+        """
+        self._computed_statistics.append(statistics)
+        print(statistics)  # <-- Log to the terminal
 
     def run_consistently_changing_benchmark_fictitious_scenario(
             self,
@@ -154,11 +271,16 @@ class SimulateScenario:
             positive,
             show_image,
             image_type="line",
-            repeats=0) -> None:
+            repeats=0,
+            processes=None) -> None:
         """
         A simulation where the benchmark is consistently randomly increased.
         This will generate an ever changing benchmark that can help us find the correct critical values.
 
+        When processes is given the (delta, repeat) simulations are spread over a process pool.
+        Every simulation then gets its own generator seeded from (SEED, delta, repeat), so the
+        results are identical for any amount of workers and are recorded in the usual order.
+
         :param image_type:
         :param percent_of_data: The amount in percentage of the
         data set that needs to be changed.
@@ -168,6 +290,8 @@ class SimulateScenario:
         the change over the data set. more repeats will give you more perspectives on how your data sets changes.)
         :param positive: True when the change the delta needs to increase on false delta will be used
         to decrease response time
+        :param processes: The amount of worker processes for a parallel, deterministic sweep.
+        When not given the simulations run one after another using the global random module.
         """
         delta_array = []
         delta = 0
@@ -175,33 +299,57 @@ class SimulateScenario:
             delta_array.append(round(delta, 3))
             delta = delta + 1
 
-        for random_amount_of_increase in delta_array:
-            repeats = 1 if repeats == 0 else repeats
-            for repeat_id in range(0, repeats):
-                self._simulate_scenario(
-                    percent_of_data_set=percent_of_data,
-                    delta=random_amount_of_increase,
-                    c_id=repeat_id,
-                    save_image=save_image,
-                    show_image=show_image,
-                    image_type=image_type,
-                    positive=positive
-                )
+        repeats = 1 if repeats == 0 else repeats
+        tasks = [
+            {
+                "percent_of_data_set": percent_of_data,
+                "delta": random_amount_of_increase,
+                "c_id": repeat_id,
+                "save_image": save_image,
+                "show_image": show_image,
+                "image_type": image_type,
+                "positive": positive
+            }
+            for random_amount_of_increase in delta_array
+            for repeat_id in range(0, repeats)
+        ]
+
+        if processes is None:
+            for task in tasks:
+                self._simulate_scenario(**task)
+            self._wait_for_image_exports()
+            return
+
+        if show_image:
+            raise ValueError("Images can not be shown from worker processes, use save_image instead.")
+
+        for task in tasks:
+            task.update(seeded=True, record=False)
+
+        if processes == 1:
+            results = [self._simulate_scenario(**task) for task in tasks]
+            self._wait_for_image_exports()
+        else:
+            with ProcessPoolExecutor(processes, initializer=_initialize_worker, initargs=(self,)) as executor:
+                results = list(executor.map(_simulate_task, tasks))
+
+        for statistics in results:
+            self._record_statistics(statistics)
 
     def run_original_scenario(self, order_of_comparison: list) -> None:
         """
 
         :return:
         """
+        raw_data = open_results(self.data_set_location)
         for simulation in order_of_comparison:
             instructions = simulation["instructions"]
-            raw_data = ConvertCsvResultsIntoDictionary(self.data_set_location).data
             baseline_response_times = raw_data[instructions[0]]["response_times"]
             benchmark_response_times = raw_data[instructions[1]]["response_times"]
 
             statistical_distance_test = StatisticalDistance(
-                baseline_ecdf=baseline_response_times,
-                benchmark_ecdf=benchmark_response_times,
+                baseline_ecdf=SortedSample(baseline_response_times),
+                benchmark_ecdf=SortedSample(benchmark_response_times),
                 heuristics_boundaries=self.heuristics_boundaries
             )
             statistics = {
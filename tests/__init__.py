@@ -0,0 +1,27 @@
+# coding=utf-8
+import os
+
+# The data sets that are bundled with the repository.
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+LOCATION_HENDRICKS_SET_001 = os.path.join(DATA_FOLDER, "hendricks", "raw-performance-test-data-001.csv")
+LOCATION_DAWSON_SET_001 = os.path.join(DATA_FOLDER, "dawson", "mdawson-perftest-1.csv")
+
+# The heuristics boundaries used in the read-me example.
+HEURISTICS_BOUNDARIES = {
+    "letter_ranks": [
+
+        {"wasserstein_boundary": 0.020, "kolmogorov_smirnov_boundary": 0.060, "rank": "S"},
+        {"wasserstein_boundary": 0.030, "kolmogorov_smirnov_boundary": 0.070, "rank": "A"},
+        {"wasserstein_boundary": 0.040, "kolmogorov_smirnov_boundary": 0.080, "rank": "B"},
+        {"wasserstein_boundary": 0.050, "kolmogorov_smirnov_boundary": 0.090, "rank": "C"},
+        {"wasserstein_boundary": 0.075, "kolmogorov_smirnov_boundary": 0.100, "rank": "D"},
+        {"wasserstein_boundary": 0.100, "kolmogorov_smirnov_boundary": 0.125, "rank": "E"},
+        {"wasserstein_boundary": 0.125, "kolmogorov_smirnov_boundary": 0.150, "rank": "F"},
+    ],
+    "score_boundaries": {
+        "wasserstein_lowest_boundary": 0.030,
+        "kolmogorov_smirnov_lowest_boundary": 0.060,
+        "matrix_size": 100,
+        "boundary_increment": 0.001
+    }
+}
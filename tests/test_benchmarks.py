@@ -0,0 +1,18 @@
+from benchmarks.suite import BENCHMARKS, run_suite, find_regressions
+import unittest
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_if_the_benchmark_suite_flags_regressions(self) -> None:
+        """
+        Will run every benchmark once on a small synthetic data set and verify if
+        an artificially slowed down copy of the results is flagged as a regression.
+        """
+        results = run_suite(sizes=[1000], repeats=1, bundled=False)
+        self.assertEqual({result["benchmark"] for result in results["results"]},
+                         {benchmark.name for benchmark in BENCHMARKS})
+        self.assertEqual(find_regressions(results, results), [])
+
+        slowed = {"results": [dict(result, seconds=result["seconds"] * 2 + 0.01) for result in results["results"]]}
+        self.assertEqual(len(find_regressions(slowed, results)), len(results["results"]))
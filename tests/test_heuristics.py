@@ -0,0 +1,298 @@
+from heuristics.kolmogorov_smirnov_and_wasserstein import StatisticalDistance
+from heuristics.kullback_leibler_divergence_testing import DivergenceTest
+from heuristics.percentile_comparison import PercentileComparison
+from heuristics.students_t_test_used_for_outlier_check import TTest
+from heuristics.distance_matrix import RunDistanceMatrix
+from heuristics.transaction_comparison import TransactionComparison
+from heuristics.misc.measurements import Measurements, StreamingMeasurements
+from heuristics.misc.samples import SortedSample
+from heuristics.misc.kernels import calculate_distance_statistics
+from heuristics.misc.resampling import bootstrap_distance_statistics, merge_into_grid, distance_statistics_on_grid, \
+    permutation_kolmogorov_smirnov_probability
+from heuristics.misc import resampling
+from heuristics.misc.instrumentation import enable_instrumentation, disable_instrumentation
+from data.wranglers import ConvertCsvResultsIntoArrays
+from tests import LOCATION_HENDRICKS_SET_001, HEURISTICS_BOUNDARIES
+from scipy.stats import ks_2samp, wasserstein_distance
+from unittest import mock
+import pandas as pd
+import numpy as np
+import unittest
+
+
+class TestHeuristics(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Will structure the raw data object used in the tests.
+        """
+        raw_data = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)
+        self.baseline = raw_data["RID-1"]["response_times"].tolist()
+        self.benchmark = raw_data["RID-2"]["response_times"].tolist()
+
+    def test_if_every_heuristic_accepts_a_sorted_sample(self) -> None:
+        """
+        Handing a SortedSample to a heuristic should give the same outcome as handing it the raw data.
+        """
+        baseline, benchmark = SortedSample(self.baseline), SortedSample(self.benchmark)
+
+        expected = StatisticalDistance(
+            Measurements(self.baseline).ecdf, Measurements(self.benchmark).ecdf, HEURISTICS_BOUNDARIES
+        )
+        distance = StatisticalDistance(baseline, benchmark, HEURISTICS_BOUNDARIES)
+        self.assertEqual(distance.kolmogorov_smirnov_distance, expected.kolmogorov_smirnov_distance)
+        self.assertEqual(distance.wasserstein_distance, expected.wasserstein_distance)
+        self.assertEqual(distance.score, expected.score)
+        self.assertEqual(distance.letter_rank, expected.letter_rank)
+
+        self.assertEqual(
+            DivergenceTest(baseline, benchmark).d_value, DivergenceTest(self.baseline, self.benchmark).d_value
+        )
+        self.assertEqual(
+            PercentileComparison(benchmark, baseline).score,
+            PercentileComparison(Measurements(self.benchmark).percentiles, Measurements(self.baseline).percentiles).score
+        )
+        self.assertAlmostEqual(TTest(baseline, benchmark).value, TTest(self.baseline, self.benchmark).value, places=9)
+
+    def test_if_an_empty_sorted_sample_has_no_minimum_or_maximum(self) -> None:
+        """
+        An empty sample has no extremes, asking for them should raise a ValueError instead of an IndexError.
+        """
+        sample = SortedSample([])
+        self.assertEqual(sample.count, 0)
+        with self.assertRaises(ValueError):
+            sample.min
+        with self.assertRaises(ValueError):
+            sample.max
+
+    def test_if_the_merge_kernels_match_scipy(self) -> None:
+        """
+        The distances computed by merging the sorted ECDF's should match the rounded scipy statistics.
+        """
+        baseline, benchmark = SortedSample(self.baseline).normalized, SortedSample(self.benchmark).normalized
+        expected = ks_2samp(baseline, benchmark, method="asymp")
+
+        distance = StatisticalDistance(
+            SortedSample(self.baseline), SortedSample(self.benchmark), HEURISTICS_BOUNDARIES, probability_method="asymp"
+        )
+        self.assertEqual(distance.kolmogorov_smirnov_distance, round(expected.statistic, 3))
+        self.assertEqual(distance.wasserstein_distance, round(wasserstein_distance(baseline, benchmark), 3))
+        self.assertAlmostEqual(distance.kolmogorov_smirnov_probability, expected.pvalue)
+
+    def test_if_the_scoring_matrix_is_cached_without_touching_the_global_random_state(self) -> None:
+        """
+        Building a distance test should reuse the compiled scoring matrix and leave np.random alone.
+        """
+        np.random.seed(42)
+        expected = np.random.random()
+        np.random.seed(42)
+        first = StatisticalDistance(SortedSample(self.baseline), SortedSample(self.benchmark), HEURISTICS_BOUNDARIES)
+        second = StatisticalDistance(SortedSample(self.benchmark), SortedSample(self.baseline), HEURISTICS_BOUNDARIES)
+        self.assertEqual(np.random.random(), expected)
+        self.assertIs(first._scoring_matrix, second._scoring_matrix)
+        self.assertEqual(len(first.SCORING_MATRIX), HEURISTICS_BOUNDARIES["score_boundaries"]["matrix_size"])
+
+    def test_if_the_distance_matrix_matches_pairwise_distance_tests(self) -> None:
+        """
+        Every cell of the all-pairs matrix should equal a separate StatisticalDistance comparison.
+        """
+        raw_data = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)
+        matrix = RunDistanceMatrix(raw_data, HEURISTICS_BOUNDARIES, processes=2)
+        for baseline_id, benchmark_id in (("RID-1", "RID-2"), ("RID-4", "RID-3")):
+            expected = StatisticalDistance(
+                SortedSample(raw_data[baseline_id]["response_times"]),
+                SortedSample(raw_data[benchmark_id]["response_times"]),
+                HEURISTICS_BOUNDARIES
+            )
+            self.assertEqual(
+                matrix.kolmogorov_smirnov_distance.loc[baseline_id, benchmark_id], expected.kolmogorov_smirnov_distance
+            )
+            self.assertEqual(matrix.wasserstein_distance.loc[baseline_id, benchmark_id], expected.wasserstein_distance)
+            self.assertEqual(matrix.score.loc[benchmark_id, baseline_id], expected.score)
+            self.assertEqual(matrix.letter_rank.loc[baseline_id, benchmark_id], expected.letter_rank)
+        self.assertIn(matrix.stable_baseline, raw_data.keys())
+
+    def test_if_transactions_are_compared_separately(self) -> None:
+        """
+        Every transaction should get its own row with the outcome of each heuristic.
+        """
+        raw_data = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)
+        comparison = TransactionComparison(raw_data, "RID-1", "RID-2", HEURISTICS_BOUNDARIES, processes=2)
+        self.assertEqual(comparison.results["transaction"].tolist(), comparison.transactions)
+
+        row = comparison.results.set_index("transaction").loc["TR_015"]
+        run_a, run_b = raw_data["RID-1"], raw_data["RID-2"]
+        baseline = SortedSample(run_a["response_times"][run_a["actions"] == "TR_015"])
+        benchmark = SortedSample(run_b["response_times"][run_b["actions"] == "TR_015"])
+        expected = StatisticalDistance(baseline, benchmark, HEURISTICS_BOUNDARIES)
+        self.assertEqual(row["baseline_count"], baseline.count)
+        self.assertEqual(row["distance_score"], expected.score)
+        self.assertEqual(row["divergence"], DivergenceTest(baseline, benchmark).d_value)
+
+    def test_if_a_columnar_data_set_keeps_its_own_encoding(self) -> None:
+        """
+        The action codes of a columnar data set should be reused instead of decoding and factorizing the names,
+        the outcome should be the same as for the plain dictionary.
+        """
+        raw_data = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)
+        with mock.patch("heuristics.transaction_comparison.pd.factorize") as factorize:
+            columnar = TransactionComparison(raw_data, "RID-1", "RID-2", HEURISTICS_BOUNDARIES, processes=1)
+            factorize.assert_not_called()
+        plain = TransactionComparison(raw_data.data, "RID-1", "RID-2", HEURISTICS_BOUNDARIES, processes=1)
+        self.assertEqual(columnar.transactions, plain.transactions)
+        pd.testing.assert_frame_equal(columnar.results, plain.results)
+
+    def test_if_measurements_without_a_transaction_are_left_out(self) -> None:
+        """
+        A measurement without a transaction name should not be counted under another transaction.
+        """
+        runs = {
+            "RID-1": {"response_times": [1.0, 2.0, 3.0, 4.0], "actions": ["TR_001", None, "TR_002", "TR_001"]},
+            "RID-2": {"response_times": [1.0, 2.0, 3.0, 4.0], "actions": [np.nan, "TR_002", "TR_002", "TR_001"]},
+        }
+        comparison = TransactionComparison(runs, "RID-1", "RID-2", HEURISTICS_BOUNDARIES, processes=1)
+        self.assertEqual(comparison.transactions, ["TR_001", "TR_002"])
+        self.assertEqual(comparison.results["baseline_count"].tolist(), [2, 1])
+        self.assertEqual(comparison.results["benchmark_count"].tolist(), [1, 2])
+
+    def test_if_the_divergence_test_can_be_run_in_batch(self) -> None:
+        """
+        A batch of divergence tests should match running them one by one,
+        including the forced divergence of 100 when the logarithm is undefined.
+        """
+        negative = (-np.asarray(self.benchmark)).tolist()
+        populations_a = [self.baseline, self.benchmark, self.baseline]
+        populations_b = [self.benchmark, self.benchmark, negative]
+
+        for test, population_a, population_b in zip(DivergenceTest.batch(populations_a, populations_b),
+                                                    populations_a, populations_b):
+            expected = DivergenceTest(population_a, population_b)
+            self.assertEqual((test.d_value, test.rank, test.score), (expected.d_value, expected.rank, expected.score))
+            self.assertEqual(test.absolute_change, expected.absolute_change)
+
+        self.assertEqual(DivergenceTest(self.benchmark, self.benchmark).score, 100)
+        self.assertEqual(DivergenceTest(self.baseline, negative).absolute_change[0], 100)
+        self.assertEqual(DivergenceTest._calculate_kl_divergence([1, 2], [1, 0]), 100)
+
+    def test_if_the_percentile_comparison_is_idempotent_and_can_be_batched(self) -> None:
+        """
+        Reading the score twice should give the same outcome and scoring many
+        benchmarks at once should match scoring them one by one.
+        """
+        baseline = SortedSample(self.baseline).percentiles(range(1, 100))
+        benchmarks = np.array([
+            SortedSample(self.benchmark).percentiles(range(1, 100)), baseline * 1.25, baseline * 0.8, baseline
+        ])
+
+        comparison = PercentileComparison(benchmarks[0].tolist(), baseline.tolist())
+        self.assertEqual(comparison.score, comparison.score)
+        self.assertEqual(
+            PercentileComparison.score_many(benchmarks, baseline).tolist(),
+            [PercentileComparison(benchmark.tolist(), baseline.tolist()).score for benchmark in benchmarks]
+        )
+        self.assertEqual(PercentileComparison(baseline.tolist(), baseline.tolist()).score, 100)
+
+    def test_if_the_t_test_can_run_on_summaries_and_in_batch(self) -> None:
+        """
+        A t-test on streamed or summarized runs and a batch of t-tests should match the t-test on raw data.
+        """
+        expected = TTest(self.baseline, self.benchmark)
+        streamed = TTest(StreamingMeasurements([self.baseline]), StreamingMeasurements([self.benchmark]))
+        summarized = TTest.from_summary(np.mean(self.baseline), np.var(self.baseline), len(self.baseline),
+                                        np.mean(self.benchmark), np.var(self.benchmark), len(self.benchmark))
+        for t_test in (streamed, summarized):
+            self.assertAlmostEqual(t_test.value, expected.value, places=9)
+            self.assertEqual((t_test.critical_value, t_test.results), (expected.critical_value, expected.results))
+
+        results = TTest.batch([expected.baseline_mean, 0.0, 1.0], [expected.baseline_variance, 0.0, 0.0],
+                              [expected.baseline_number_of_samples, 10, 10],
+                              [expected.benchmark_mean, 0.0, 2.0], [expected.benchmark_variance, 0.0, 0.0],
+                              [expected.benchmark_number_of_samples, 10, 10])
+        self.assertEqual(results.t_values[0], expected.value)
+        self.assertEqual(results.critical_t_values[0], expected.critical_value)
+        self.assertEqual(results.t_values[1:].tolist(), [0.0, float("inf")])
+        self.assertEqual(results.results.tolist(), [expected.results, True, False])
+
+        # Without any noise a changed mean is the largest possible difference.
+        for t_test in (TTest.from_summary(1.0, 0.0, 10, 2.0, 0.0, 10), TTest([1.0] * 10, [2.0] * 10)):
+            self.assertEqual((t_test.value, t_test.results), (float("inf"), False))
+
+    def test_if_the_bootstrap_is_reproducible_and_covers_the_distances(self) -> None:
+        """
+        The bootstrap should not depend on the amount of processes, the grid kernel should match
+        the merge kernel and the intervals should contain the measured distances.
+        """
+        baseline, benchmark = SortedSample(self.baseline).normalized, SortedSample(self.benchmark).normalized
+        values, positions_a, positions_b = merge_into_grid(baseline, benchmark)
+        distances = distance_statistics_on_grid(values, np.bincount(positions_a, minlength=values.size)[np.newaxis],
+                                                np.bincount(positions_b, minlength=values.size)[np.newaxis])
+        expected = calculate_distance_statistics(baseline, benchmark)
+        self.assertEqual(distances[0][0], expected[0])
+        self.assertAlmostEqual(distances[1][0], expected[1], places=12)
+
+        with mock.patch.object(resampling, "BATCH_CELLS", 500000):
+            serial = bootstrap_distance_statistics(baseline, benchmark, resamples=200, processes=1)
+            parallel = bootstrap_distance_statistics(baseline, benchmark, resamples=200, processes=2)
+        self.assertTrue(np.array_equal(serial[0], parallel[0]) and np.array_equal(serial[1], parallel[1]))
+
+        distance = StatisticalDistance(SortedSample(self.baseline), SortedSample(self.benchmark), HEURISTICS_BOUNDARIES,
+                                       bootstrap_resamples=200, processes=1)
+        lower, upper = distance.confidence_intervals["kolmogorov_smirnov_distance"]
+        self.assertLessEqual(lower, distance.kolmogorov_smirnov_distance)
+        self.assertGreaterEqual(upper, distance.kolmogorov_smirnov_distance)
+        lower, upper = distance.confidence_intervals["wasserstein_distance"]
+        self.assertLessEqual(lower, distance.wasserstein_distance)
+        self.assertGreaterEqual(upper, distance.wasserstein_distance)
+        self.assertIsNone(StatisticalDistance(SortedSample(self.baseline), SortedSample(self.benchmark),
+                                              HEURISTICS_BOUNDARIES).confidence_intervals)
+
+    def test_if_the_permutation_probability_is_seeded_and_stops_early(self) -> None:
+        """
+        The permutation p-value should be reproducible, stop early on a clear difference,
+        respect the cap and agree with the exact p-value on data without ties.
+        """
+        distances = [
+            StatisticalDistance(SortedSample(self.baseline), SortedSample(self.benchmark), HEURISTICS_BOUNDARIES,
+                                probability_method="permutation")
+            for _ in range(2)
+        ]
+        self.assertEqual(distances[0].kolmogorov_smirnov_probability, distances[1].kolmogorov_smirnov_probability)
+        self.assertLess(distances[0].kolmogorov_smirnov_probability, 0.05)
+        self.assertLess(distances[0].permutations, StatisticalDistance.MAX_PERMUTATIONS)
+        capped = StatisticalDistance(SortedSample(self.baseline), SortedSample(self.benchmark), HEURISTICS_BOUNDARIES,
+                                     probability_method="permutation", permutation_alpha=0.01, max_permutations=50)
+        self.assertEqual((capped.permutation_alpha, capped.permutations), (0.01, 50))
+
+        generator = np.random.default_rng(1996)
+        sample_a, sample_b = np.sort(generator.normal(size=300)), np.sort(generator.normal(0.1, size=300))
+        probability, permutations = permutation_kolmogorov_smirnov_probability(sample_a, sample_b,
+                                                                               max_permutations=2000)
+        self.assertLessEqual(permutations, 2000)
+        self.assertAlmostEqual(probability, ks_2samp(sample_a, sample_b, method="exact").pvalue, delta=0.05)
+
+    def test_if_the_stages_are_timed_and_traced_only_when_enabled(self) -> None:
+        """
+        With instrumentation enabled every stage should be recorded in the timings and handed to
+        the tracer, without it the timings stay empty and the outcome is the same.
+        """
+        expected = StatisticalDistance(SortedSample(self.baseline), SortedSample(self.benchmark), HEURISTICS_BOUNDARIES)
+        self.assertEqual(expected.timings, {})
+
+        traced = []
+        enable_instrumentation(tracer=traced.append, trace_memory=True)
+        try:
+            distance = StatisticalDistance(SortedSample(self.baseline), SortedSample(self.benchmark),
+                                           HEURISTICS_BOUNDARIES)
+            measurements = Measurements(self.baseline)
+            measurements.ecdf
+        finally:
+            disable_instrumentation()
+
+        self.assertEqual(distance.score, expected.score)
+        self.assertEqual(list(distance.timings.keys()),
+                         ["normalization", "ecdf", "distances", "kolmogorov_smirnov_probability", "scoring"])
+        self.assertEqual(distance.timings["normalization"].samples, len(self.baseline) + len(self.benchmark))
+        self.assertEqual(list(measurements.timings.keys()), ["normalization", "ecdf"])
+        self.assertGreater(measurements.timings["ecdf"].allocated_bytes, 0)
+        self.assertEqual([timing.stage for timing in traced][-2:], ["normalization", "ecdf"])
+        self.assertTrue(all(timing.seconds >= 0 for timing in traced))
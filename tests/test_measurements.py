@@ -0,0 +1,77 @@
+from heuristics.misc.measurements import Measurements, StreamingMeasurements
+from data.wranglers import ConvertCsvResultsIntoArrays, read_response_times_in_chunks
+from tests import LOCATION_HENDRICKS_SET_001
+import numpy as np
+import unittest
+
+
+class TestMeasurements(unittest.TestCase):
+
+    def setUp(self) -> None:
+        """
+        Will structure the raw data object used in the tests.
+        """
+        self.raw_data = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)
+
+    def test_if_streaming_statistics_match_the_raw_statistics(self) -> None:
+        """
+        Summarizing a run chunk by chunk should give the same statistics as
+        summarizing the full raw data.
+        """
+        measurements = Measurements(self.raw_data["RID-1"]["response_times"].tolist())
+        streaming = StreamingMeasurements(
+            read_response_times_in_chunks(LOCATION_HENDRICKS_SET_001, run_id="RID-1", chunksize=1000)
+        )
+        self.assertEqual(streaming.count, measurements.count)
+        self.assertEqual(streaming.average, measurements.average)
+        self.assertEqual(streaming.min, measurements.min)
+        self.assertEqual(streaming.max, measurements.max)
+        self.assertAlmostEqual(streaming.sum, measurements.sum, places=6)
+        self.assertAlmostEqual(streaming.standard_deviation, measurements.standard_deviation, places=9)
+
+    def test_if_streams_can_be_merged(self) -> None:
+        """
+        Two separately summarized runs should merge into the summary of both runs.
+        """
+        first, second = self.raw_data["RID-1"]["response_times"], self.raw_data["RID-2"]["response_times"]
+        merged = StreamingMeasurements([first])
+        merged.merge(StreamingMeasurements([second]))
+        measurements = Measurements(first.tolist() + second.tolist())
+        self.assertEqual(merged.count, measurements.count)
+        self.assertAlmostEqual(merged.standard_deviation, measurements.standard_deviation, places=9)
+
+        # A sketch can not be merged with a stream that has none.
+        for stream, other in ((StreamingMeasurements([first], sketch_accuracy=0.01), StreamingMeasurements([second])),
+                              (StreamingMeasurements([first]), StreamingMeasurements([second], sketch_accuracy=0.01))):
+            with self.assertRaisesRegex(ValueError, "sketch"):
+                stream.merge(other)
+            self.assertEqual(stream.count, len(first))
+
+    def test_if_the_sketch_estimates_percentiles_within_its_accuracy(self) -> None:
+        """
+        The percentiles estimated by merged sketches should be close to the exact percentiles.
+        """
+        raw = self.raw_data["RID-1"]["response_times"]
+        exact = Measurements(raw.tolist())
+        first, second = StreamingMeasurements(sketch_accuracy=0.01), StreamingMeasurements(sketch_accuracy=0.01)
+        first.update(raw[:len(raw) // 2])
+        second.update(raw[len(raw) // 2:])
+        first.merge(second)
+
+        # With ties a measurement covers a range of ranks, the requested rank should fall in (or near) it.
+        lowest_ranks = np.searchsorted(np.sort(raw), first.percentiles, side="left") / len(raw) * 100
+        highest_ranks = np.searchsorted(np.sort(raw), first.percentiles, side="right") / len(raw) * 100
+        percentiles = np.arange(1, 100)
+        self.assertTrue(np.all((lowest_ranks - 2 <= percentiles) & (percentiles <= highest_ranks + 2)))
+        self.assertLessEqual(abs(first.outlier_threshold - exact.outlier_threshold), 0.01)
+        self.assertLess(first.sketch.size, len(raw))
+
+    def test_if_the_percentile_engine_matches_numpy(self) -> None:
+        """
+        Sorting once and interpolating all percentiles should give the exact np.percentile outcome.
+        """
+        raw = self.raw_data["RID-1"]["response_times"]
+        self.assertEqual(
+            Measurements(raw.tolist()).percentiles,
+            [float(np.percentile(raw, percentile)) for percentile in range(1, 100)]
+        )
@@ -0,0 +1,97 @@
+from testing.simulators import SimulateScenario, _get_scenario_factory, clear_scenario_factories
+from tests import HEURISTICS_BOUNDARIES
+from unittest import mock
+import numpy as np
+import contextlib
+import unittest
+import tempfile
+import shutil
+import io
+import os
+
+
+class TestSimulators(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """
+        Will write a small data set, so a whole sweep of a hundred deltas stays fast.
+        """
+        cls.folder = tempfile.mkdtemp()
+        cls.location = os.path.join(cls.folder, "results.csv")
+        generator = np.random.default_rng(1996)
+        with open(cls.location, "w") as file:
+            file.write("ResponseTime;RunID;Time;TransactionName\n")
+            for run_id in ("RID-1", "RID-2"):
+                for timestamp, response_time in enumerate(np.round(generator.lognormal(-1, 0.5, 500), 3)):
+                    file.write(f"{response_time:.3f}".replace(".", ",") + f";{run_id};{timestamp};TR_001\n")
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.folder)
+
+    def _sweep(self, **kwargs) -> SimulateScenario:
+        """
+        Will run a quiet sweep over every delta.
+        :param kwargs: The keyword arguments of the sweep.
+        :return: The simulation with the recorded statistics.
+        """
+        simulation = SimulateScenario(self.location, HEURISTICS_BOUNDARIES, benchmark_id="RID-2", baseline_id="RID-1")
+        arguments = dict(percent_of_data=10, save_image=False, positive=True, show_image=False, repeats=2)
+        arguments.update(kwargs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            simulation.run_consistently_changing_benchmark_fictitious_scenario(**arguments)
+        return simulation
+
+    def test_if_a_parallel_sweep_does_not_depend_on_the_amount_of_workers(self) -> None:
+        """
+        Every (delta, repeat) task has its own seeded generator, so one or two workers
+        should record exactly the same statistics in the same order.
+        """
+        serial = self._sweep(processes=1)._computed_statistics
+        parallel = self._sweep(processes=2)._computed_statistics
+        self.assertEqual(len(serial), 200)
+        self.assertEqual(serial, parallel)
+        self.assertNotEqual(serial[0], serial[-1])
+
+    def test_if_the_scenario_factory_is_read_again_when_the_data_set_changes(self) -> None:
+        """
+        The cached factory should only be reused for as long as the data set stays the same.
+        """
+        location = os.path.join(self.folder, "changing.csv")
+        shutil.copyfile(self.location, location)
+        factory = _get_scenario_factory(location, "RID-1", "RID-2")
+        self.assertIs(_get_scenario_factory(location, "RID-1", "RID-2"), factory)
+
+        with open(location, "a") as file:
+            file.write("9,999;RID-2;9999;TR_001\n")
+        changed = _get_scenario_factory(location, "RID-1", "RID-2")
+        self.assertIsNot(changed, factory)
+        self.assertEqual(len(changed.benchmark_y), len(factory.benchmark_y) + 1)
+
+        clear_scenario_factories()
+        self.assertIsNot(_get_scenario_factory(location, "RID-1", "RID-2"), changed)
+        clear_scenario_factories()
+
+    def test_if_figures_are_only_build_when_they_are_saved_or_shown(self) -> None:
+        """
+        Building a plotly figure is costly, a sweep that neither saves nor shows images should not build any.
+        """
+        with mock.patch("testing.simulators.LineGraph") as line_graph, \
+                mock.patch("testing.simulators.ScatterPlot") as scatter_plot, \
+                mock.patch("testing.simulators._get_image_exporter") as image_exporter:
+            self._sweep(processes=1, image_type="line")
+            self._sweep(processes=1, image_type="scatter")
+            line_graph.assert_not_called()
+            scatter_plot.assert_not_called()
+            image_exporter.assert_not_called()
+
+            self._sweep(show_image=True, image_type="line", repeats=1)
+            self.assertEqual(line_graph.call_count, 100)
+            self.assertEqual(line_graph.return_value.show.call_count, 100)
+            scatter_plot.assert_not_called()
+
+            self._sweep(save_image=True, image_type="scatter", repeats=1)
+            self.assertEqual(scatter_plot.call_count, 100)
+            self.assertEqual(image_exporter.return_value.save_frame.call_count, 100)
+            scatter_plot.return_value.show.assert_not_called()
@@ -0,0 +1,124 @@
+from data.visuals import ImageExporter, Animation, LineGraph, ScatterPlot
+from heuristics.misc.samples import SortedSample
+from types import SimpleNamespace
+import plotly.graph_objects as go
+from unittest import mock
+import numpy as np
+import tempfile
+import imageio
+import os
+import threading
+import unittest
+import time
+
+
+class RecordingGraph:
+    """
+    A graph that records its exports instead of rendering them.
+    """
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.saved = []
+        self.running = 0
+        self.most_running = 0
+        self._lock = threading.Lock()
+
+    def save_frame(self, folder, filename, image_format=".png", engine="orca"):
+        with self._lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+            self.saved.append((folder, filename, image_format, engine))
+        if self.fail:
+            raise RuntimeError("render failed")
+
+
+class TestVisuals(unittest.TestCase):
+
+    def test_if_the_image_exporter_saves_every_frame_with_bounded_workers(self) -> None:
+        """
+        Every queued frame should be saved by at most max_workers threads at a time.
+        """
+        graph = RecordingGraph(delay=0.01)
+        with ImageExporter(max_workers=2, engine="kaleido") as exporter:
+            for frame in range(10):
+                exporter.save_frame(graph, "frames", filename=f"{frame}")
+
+        self.assertEqual(sorted(int(saved[1]) for saved in graph.saved), list(range(10)))
+        self.assertLessEqual(graph.most_running, 2)
+        self.assertTrue(all(saved[3] == "kaleido" for saved in graph.saved))
+
+    def test_if_the_image_exporter_raises_export_errors(self) -> None:
+        """
+        A failed export should be raised when waiting for the exports.
+        """
+        exporter = ImageExporter(max_workers=1, engine="kaleido")
+        exporter.save_frame(RecordingGraph(fail=True), "frames", filename="0")
+        with self.assertRaises(RuntimeError):
+            exporter.close()
+
+
+    def test_if_the_animation_keeps_the_order_of_the_frames(self) -> None:
+        """
+        The frames should be written in numeric order and can be downscaled.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            for frame in range(12):
+                imageio.imwrite(os.path.join(folder, f"{frame}.png"), np.full((20, 40, 3), frame * 20, dtype=np.uint8))
+
+            location = Animation.render_frames_in_target_directory_to_gif(folder, folder, workers=2, scale=0.5)
+            frames = imageio.mimread(location)
+
+        self.assertEqual(len(frames), 12)
+        self.assertEqual(frames[0].shape[:2], (10, 20))
+        self.assertEqual([int(frame[0, 0, 0]) for frame in frames], [frame * 20 for frame in range(12)])
+
+    def test_if_the_line_graph_downsamples_without_mutating_the_ecdfs(self) -> None:
+        """
+        Large ECDF's should be reduced while the kolmogorov smirnov gap stays visible.
+        """
+        generator = np.random.default_rng(1996)
+        baseline = SortedSample(generator.lognormal(size=200000)).ecdf
+        benchmark = SortedSample(generator.lognormal(0.05, size=150000)).ecdf
+        columns = (list(baseline.columns), list(benchmark.columns))
+
+        graph = LineGraph(benchmark, baseline, 0.1, 0.1, "A", 90, 5, max_points=1000)
+        gap = LineGraph._kolmogorov_smirnov_gap(baseline, benchmark)
+
+        self.assertEqual((list(baseline.columns), list(benchmark.columns)), columns)
+        for name, ecdf in (("baseline", baseline), ("benchmark", benchmark)):
+            drawn = graph.dataframe[graph.dataframe["type"] == name]
+            self.assertLessEqual(len(drawn), 1002)
+            self.assertEqual(drawn["measure"].iloc[-1], ecdf["measure"].iloc[-1])
+            self.assertIn(ecdf["measure"].values[np.searchsorted(ecdf["measure"].values, gap, side="right") - 1],
+                          drawn["measure"].values)
+
+        # ECDF's that already fit are drawn as they are, without looking for the gap.
+        with mock.patch.object(LineGraph, "_kolmogorov_smirnov_gap") as find_gap:
+            graph = LineGraph(benchmark.iloc[:500], baseline.iloc[:800], 0.1, 0.1, "A", 90, 5, max_points=1000)
+        find_gap.assert_not_called()
+        self.assertEqual(len(graph.dataframe), 1300)
+
+    def test_if_the_scatter_plot_switches_mode_on_large_runs(self) -> None:
+        """
+        Large runs should be drawn with WebGL and very large runs as a bounded density grid.
+        """
+        generator = np.random.default_rng(1996)
+
+        def scenario(size):
+            return SimpleNamespace(baseline_x=np.arange(size), baseline_y=generator.lognormal(size=size),
+                                   benchmark_x=np.arange(size), benchmark_y=generator.lognormal(size=size))
+
+        self.assertEqual(ScatterPlot(scenario(100), "A", 90, 5).render_mode, "svg")
+        self.assertIsInstance(ScatterPlot(scenario(100), "A", 90, 5, mode="webgl")._render_figure().data[0],
+                              go.Scattergl)
+
+        plot = ScatterPlot(scenario(ScatterPlot.DENSITY_THRESHOLD + 1), "A", 90, 5)
+        figure = plot._render_figure()
+        self.assertEqual(plot.render_mode, "density")
+        self.assertIsInstance(figure.data[0], go.Heatmap)
+        self.assertEqual(np.asarray(figure.data[0].z).shape, ScatterPlot.DENSITY_BINS[::-1])
@@ -0,0 +1,179 @@
+from data.wranglers import ConvertCsvResultsIntoDictionary, ConvertCsvResultsIntoArrays, ColumnarRunStore, \
+    CreateFictitiousScenario, ScenarioFactory, open_results
+from heuristics.misc.instrumentation import enable_instrumentation, disable_instrumentation
+from tests import LOCATION_HENDRICKS_SET_001, LOCATION_DAWSON_SET_001
+from unittest import mock
+import numpy as np
+import unittest
+import tempfile
+import shutil
+import os
+
+
+class TestWranglers(unittest.TestCase):
+
+    def test_if_the_columnar_loader_matches_the_dictionary_loader(self) -> None:
+        """
+        The compatibility view of the columnar loader needs to be identical to
+        the data set that is build line by line.
+        """
+        for location in (LOCATION_HENDRICKS_SET_001, LOCATION_DAWSON_SET_001):
+            expected = ConvertCsvResultsIntoDictionary(location).data
+            columnar = ConvertCsvResultsIntoArrays(location)
+            self.assertEqual(list(columnar.keys()), list(expected.keys()))
+            self.assertEqual(columnar.data, expected)
+
+    def test_if_lines_without_a_run_id_or_action_are_rejected(self) -> None:
+        """
+        A line that misses its RunID or transaction name can not be grouped and should be reported.
+        """
+        folder = tempfile.mkdtemp()
+        try:
+            for line in ("0,5;;1000;TR_001", "0,5;RID-1;1000;"):
+                location = os.path.join(folder, "missing.csv")
+                with open(location, "w") as file:
+                    file.write("ResponseTime;RunID;Time;TransactionName\n0,1;RID-1;999;TR_001\n" + line + "\n")
+
+                with self.assertRaisesRegex(ValueError, "line 3"):
+                    ConvertCsvResultsIntoArrays(location)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_if_the_loaders_time_their_stages(self) -> None:
+        """
+        The loaders should only record the rows they parsed while instrumentation is enabled.
+        """
+        self.assertEqual(ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001).timings, {})
+
+        enable_instrumentation()
+        try:
+            dictionary = ConvertCsvResultsIntoDictionary(LOCATION_HENDRICKS_SET_001)
+            columnar = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)
+        finally:
+            disable_instrumentation()
+
+        rows = len(columnar.response_times)
+        self.assertEqual(dictionary.timings["parsing"].samples, rows)
+        self.assertEqual(list(columnar.timings.keys()), ["parsing", "grouping"])
+        self.assertEqual(columnar.timings["grouping"].samples, rows)
+        self.assertIsNone(columnar.timings["parsing"].allocated_bytes)
+
+    def test_if_a_run_is_a_contiguous_array_view(self) -> None:
+        """
+        Requesting a run should slice the columns without copying them.
+        """
+        columnar = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)
+        run = columnar["RID-2"]
+        self.assertIsInstance(run["response_times"], np.ndarray)
+        self.assertTrue(run["response_times"].flags["C_CONTIGUOUS"])
+        self.assertTrue(np.shares_memory(run["response_times"], columnar.response_times))
+        self.assertEqual(len(run["response_times"]), len(run["timestamps"]))
+
+    def test_if_the_cache_is_reloaded_and_invalidated(self) -> None:
+        """
+        The sidecar file should give back the same arrays and should be rebuild
+        once the source file changes.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            location = os.path.join(folder, "results.csv")
+            shutil.copyfile(LOCATION_DAWSON_SET_001, location)
+
+            parsed = ConvertCsvResultsIntoArrays(location, cache=True)
+            self.assertTrue(os.path.isfile(parsed.cache_location))
+            with mock.patch("data.wranglers._hash_file") as hashing:
+                reloaded = ConvertCsvResultsIntoArrays(location, cache=True)
+            hashing.assert_not_called()
+            self.assertEqual(reloaded.keys(), parsed.keys())
+            self.assertTrue(np.array_equal(reloaded.response_times, parsed.response_times))
+            self.assertEqual(reloaded.data, parsed.data)
+
+            # Touching the file without changing it is recognized by its content hash.
+            status = os.stat(location)
+            os.utime(location, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+            with mock.patch.object(ConvertCsvResultsIntoArrays, "convert_csv_to_arrays") as parsing:
+                ConvertCsvResultsIntoArrays(location, cache=True)
+            parsing.assert_not_called()
+            # The new modification time is stored, so the next reload is an os.stat again.
+            with mock.patch("data.wranglers._hash_file") as hashing:
+                ConvertCsvResultsIntoArrays(location, cache=True)
+            hashing.assert_not_called()
+
+            with open(location, "a") as file:
+                file.write("\n1,5;9999;70000;demo\n")
+            changed = ConvertCsvResultsIntoArrays(location, cache=True)
+            self.assertIn(9999, changed)
+            self.assertEqual(changed[9999]["response_times"].tolist(), [1.5])
+
+    def test_if_the_columnar_store_slices_runs_from_a_memory_map(self) -> None:
+        """
+        The store should give back the same runs as the parsed csv file while
+        reading them from memory-mapped columns.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            location = os.path.join(folder, "results.csv")
+            shutil.copyfile(LOCATION_HENDRICKS_SET_001, location)
+
+            parsed = ConvertCsvResultsIntoArrays(location)
+            store = ColumnarRunStore.from_csv(location)
+            self.assertIsInstance(store.response_times, np.memmap)
+            self.assertEqual(store.keys(), parsed.keys())
+            for run_id in parsed:
+                self.assertTrue(np.array_equal(store[run_id]["response_times"], parsed[run_id]["response_times"]))
+                self.assertEqual(store[run_id]["actions"].tolist(), parsed[run_id]["actions"].tolist())
+            self.assertIs(open_results(store.folder).__class__, ColumnarRunStore)
+
+            # A touched csv file reuses the store and is only hashed once.
+            status = os.stat(location)
+            os.utime(location, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+            self.assertEqual(ColumnarRunStore.from_csv(location).metadata["columns"], store.metadata["columns"])
+            with mock.patch("data.wranglers._hash_file") as hashing:
+                ColumnarRunStore.from_csv(location)
+            hashing.assert_not_called()
+
+            # A stale store is rebuild next to the maps that are still open, which keep the old data.
+            before = store.response_times.copy()
+            with open(location, "a") as file:
+                file.write("\n1,5;RID-9;70000;demo\n")
+            rebuild = ColumnarRunStore.from_csv(location)
+            self.assertIn("RID-9", rebuild)
+            self.assertNotIn("RID-9", store)
+            self.assertTrue(np.array_equal(store.response_times, before))
+
+            # Only the columns of the current index are left in the store.
+            self.assertEqual(sorted(os.listdir(rebuild.folder)),
+                             sorted(list(rebuild.metadata["columns"].values()) + [ColumnarRunStore.INDEX_FILE]))
+
+    def test_if_the_population_is_changed_without_mutating_the_input(self) -> None:
+        """
+        The perturbation should return a new array and change the requested part of the population.
+        """
+        population = ConvertCsvResultsIntoArrays(LOCATION_HENDRICKS_SET_001)["RID-1"]["response_times"]
+        original = population.copy()
+        changed = CreateFictitiousScenario.randomly_decrease_or_increase_part_of_the_population(
+            population=population, positive=True, percentage=50, delta=10,
+            generator=np.random.default_rng(1996), replace=False
+        )
+        self.assertTrue(np.array_equal(population, original))
+        self.assertEqual(int(np.sum(changed != population)), int(len(population) / 100 * 50))
+        self.assertTrue(np.allclose(changed[changed != population], population[changed != population] * 1.1))
+
+        compounded = CreateFictitiousScenario.randomly_decrease_or_increase_part_of_the_population(
+            population=[1.0], positive=False, percentage=300, delta=50, generator=np.random.default_rng(1996)
+        )
+        self.assertEqual(compounded.tolist(), [0.125])
+
+    def test_if_the_scenario_factory_matches_the_fictitious_scenario(self) -> None:
+        """
+        A scenario of the factory should be the same as a freshly created fictitious scenario.
+        """
+        factory = ScenarioFactory("RID-1", "RID-2", LOCATION_HENDRICKS_SET_001)
+        expected = CreateFictitiousScenario("RID-1", "RID-2", LOCATION_HENDRICKS_SET_001, positive=True,
+                                            percentage=40, delta=15, generator=np.random.default_rng(7))
+        scenario = factory.create(positive=True, percentage=40, delta=15, generator=np.random.default_rng(7),
+                                  out=factory.buffer)
+
+        self.assertIs(scenario.benchmark_y, factory.buffer)
+        self.assertIs(scenario.baseline_sample, factory.baseline_sample)
+        self.assertTrue(np.array_equal(scenario.benchmark_y, expected.benchmark_y))
+        self.assertTrue(np.array_equal(scenario.baseline_y, expected.baseline_y))
+        self.assertTrue(np.array_equal(scenario.baseline_sample.values, expected.baseline_sample.values))